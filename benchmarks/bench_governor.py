@@ -0,0 +1,171 @@
+"""
+This script checks that the RateGovernor adapts to a throttling site.
+
+It runs against the local stand-in site in fixture_server.py, with injected
+    latency and 503 responses, and checks that the governor lowers its rate
+    and concurrency while the site throttles, retries the failed fetches,
+    speeds up again once the responses are healthy, keeps to the rate of its
+    token bucket, and that a FallbackFetcher passes throttling on to it.  It
+    exits with an error if any check fails.
+
+    $ python3 benchmarks/bench_governor.py --latency 0.02 --failure-rate 0.3
+"""
+
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dvdnetflix.fetchers import Fetcher, HttpFetcher, FallbackFetcher  # noqa: E402
+from dvdnetflix.rate_governor import RateGovernor, GovernedFetcher  # noqa: E402
+from dvdnetflix.errors import ThrottledError  # noqa: E402
+from fixture_server import Catalog, start_server  # noqa: E402
+
+
+class Checks:
+    """This is a class collecting the outcome of each check."""
+
+    def __init__(self):
+        self.failures = []
+
+    def expect(self, name, condition, detail=''):
+        """This method records whether a check passed."""
+        print('%-4s %s %s' % ('ok' if condition else 'FAIL', name, detail))
+        if not condition:
+            self.failures.append(name + ' ' + detail)
+
+
+class BrowserStandIn(Fetcher):
+    """This is a fallback fetcher that only counts how often it is used."""
+
+    def __init__(self):
+        self.fetches = 0
+
+    def fetch(self, url, marker=None):
+        self.fetches += 1
+        return '<html></html>'
+
+
+def movie_urls(catalog, base_url, count):
+    """This function returns the urls of the first count movie pages."""
+    return [base_url + '/Movie/' + title['slug'] + '/' + title['id']
+            for title in list(catalog.titles.values())[:count]]
+
+
+def fetch_all(fetcher, urls, workers):
+    """This function fetches the urls on a pool of threads, and returns the failures."""
+    def fetch(url):
+        try:
+            fetcher.fetch(url, 'mdp-details')
+        except ThrottledError:
+            return 1
+        return 0
+    with ThreadPoolExecutor(workers) as executor:
+        return sum(executor.map(fetch, urls))
+
+
+def check_backoff_and_recovery(checks, catalog, server, base_url, failure_rate):
+    """
+    This function checks that the governor halves its limits while the site
+        answers with 503s, retries the failures, and speeds up again after.
+    """
+    governor = RateGovernor(rate=40., min_rate=10., max_rate=80., rate_step=5.,
+                            concurrency=8, max_concurrency=16, increase_every=5,
+                            retries=8, backoff=.01, max_backoff=.1)
+    fetcher = GovernedFetcher(HttpFetcher(), governor)
+    urls = movie_urls(catalog, base_url, 40)
+
+    server.RequestHandlerClass.failure_rate = failure_rate
+    failed = fetch_all(fetcher, urls[:20], 8)
+    throttled = governor.metrics()
+    checks.expect('throttled responses were counted', throttled['failures'] > 0,
+                  '(%d)' % throttled['failures'])
+    checks.expect('failed fetches were retried', throttled['retries'] > 0 and failed == 0,
+                  '(%d retries, %d gave up)' % (throttled['retries'], failed))
+    checks.expect('rate dropped', throttled['rate'] < 40.,
+                  '(40.00 -> %.2f requests/s)' % throttled['rate'])
+    checks.expect('concurrency dropped', throttled['concurrency'] < 8,
+                  '(8 -> %d)' % throttled['concurrency'])
+    checks.expect('rate stayed above min_rate', throttled['rate'] >= 10.)
+
+    server.RequestHandlerClass.failure_rate = 0.
+    fetch_all(fetcher, urls, 8)
+    healthy = governor.metrics()
+    checks.expect('no failures once healthy', healthy['failures'] == throttled['failures'])
+    checks.expect('rate recovered', healthy['rate'] > throttled['rate'],
+                  '(%.2f -> %.2f requests/s)' % (throttled['rate'], healthy['rate']))
+    checks.expect('concurrency recovered', healthy['concurrency'] > throttled['concurrency'],
+                  '(%d -> %d)' % (throttled['concurrency'], healthy['concurrency']))
+    fetcher.close()
+
+
+def check_token_bucket(checks, catalog, base_url, rate=20., count=30):
+    """This function checks that healthy fetches keep to the governor's rate."""
+    governor = RateGovernor(rate=rate, max_rate=rate, concurrency=8,
+                            max_concurrency=8)
+    fetcher = GovernedFetcher(HttpFetcher(), governor)
+    start = time.perf_counter()
+    fetch_all(fetcher, movie_urls(catalog, base_url, count), 8)
+    seconds = time.perf_counter() - start
+    # the bucket starts with a single token
+    fastest = (count - 1) / rate
+    checks.expect('token bucket limited the rate', seconds >= .9 * fastest,
+                  '(%d fetches in %.2f s, at least %.2f s)' % (count, seconds, fastest))
+    fetcher.close()
+
+
+def check_fallback(checks, catalog, server, base_url):
+    """
+    This function checks that throttled responses aren't retried by the
+        fallback of a FallbackFetcher, but raised to the governor.
+    """
+    server.RequestHandlerClass.failure_rate = 1.
+    governor = RateGovernor(rate=40., min_rate=10., retries=2, backoff=.01)
+    browser = BrowserStandIn()
+    fetcher = GovernedFetcher(FallbackFetcher(HttpFetcher(), browser), governor)
+    try:
+        fetcher.fetch(movie_urls(catalog, base_url, 1)[0], 'mdp-details')
+        raised = False
+    except ThrottledError:
+        raised = True
+    server.RequestHandlerClass.failure_rate = 0.
+    checks.expect('fallback raised throttling', raised and browser.fetches == 0,
+                  '(%d fallback fetches)' % browser.fetches)
+    checks.expect('governor saw every throttled attempt',
+                  governor.metrics()['failures'] == 3,
+                  '(%d of 3)' % governor.metrics()['failures'])
+    fetcher.close()
+
+
+def run_checks(catalog, server, base_url, failure_rate=.3):
+    """This function runs every check, and returns a list of the failed ones."""
+    checks = Checks()
+    check_backoff_and_recovery(checks, catalog, server, base_url, failure_rate)
+    check_token_bucket(checks, catalog, base_url)
+    check_fallback(checks, catalog, server, base_url)
+    return checks.failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--titles', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=.02,
+                        help='average seconds added to every response')
+    parser.add_argument('--failure-rate', type=float, default=.3,
+                        help='fraction of requests answered with a 503 while throttling')
+    args = parser.parse_args()
+
+    catalog = Catalog(args.titles)
+    server, base_url = start_server(catalog, latency=args.latency)
+    try:
+        failures = run_checks(catalog, server, base_url, args.failure_rate)
+    finally:
+        server.shutdown()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+This script measures how long it takes to start Python and import each module
+    of the scraper, and to run the dvdnetflix command, in fresh interpreters.
+
+Run it from the project folder:
+
+    $ python3 benchmarks/bench_import.py --runs 20
+    $ python3 benchmarks/bench_import.py --module dvdnetflix.scraper --top 15
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+MODULES = ['dvdnetflix.' + name for name in [
+    'cli', 'scraper', 'update_nfo_file', 'batch_update', 'pipeline',
+    'title_index', 'matching', 'movie_record', 'fetchers']]
+
+# modules only imported when a page is fetched, parsed or scored
+HEAVY = ('selenium', 'bs4', 'requests', 'fuzzywuzzy', 'rapidfuzz', 'numpy', 'lxml')
+
+
+def run(code, runs):
+    """This function returns the median seconds of running code in a new interpreter."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True,
+                       stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def heavy_imports(module):
+    """This function returns the heavy dependencies importing module pulls in."""
+    code = ('import sys, %s; print(" ".join(sorted({m.split(".")[0] for m in '
+            'sys.modules} & set(%r))))' % (module, HEAVY))
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True,
+                            stdout=subprocess.PIPE, universal_newlines=True)
+    return result.stdout.strip() or '-'
+
+
+def top_imports(module, count):
+    """This function returns the slowest imports of module, from -X importtime."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                             'import ' + module], cwd=ROOT, check=True,
+                            stderr=subprocess.PIPE, universal_newlines=True)
+    rows = []
+    # lines look like 'import time:       123 |        456 |   module'
+    for line in result.stderr.splitlines()[1:]:
+        self_us, cumulative_us, name = line.split(':', 1)[1].split('|')
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--module', help='also list the slowest imports of this module')
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    baseline = run('pass', args.runs)
+    print('%-28s %9.1f ms' % ('python (no imports)', 1000 * baseline))
+    for module in MODULES:
+        seconds = run('import ' + module, args.runs)
+        print('%-28s %9.1f ms  +%7.1f ms  heavy: %s'
+              % (module, 1000 * seconds, 1000 * (seconds - baseline),
+                 heavy_imports(module)))
+    seconds = run('import sys, dvdnetflix.cli as cli; sys.argv = ["dvdnetflix", "--help"]\n'
+                  'try:\n    cli.main()\nexcept SystemExit:\n    pass', args.runs)
+    print('%-28s %9.1f ms  +%7.1f ms'
+          % ('dvdnetflix --help', 1000 * seconds, 1000 * (seconds - baseline)))
+
+    if args.module:
+        print('\nslowest imports of ' + args.module + ' (cumulative, self):')
+        for cumulative_us, self_us, name in top_imports(args.module, args.top):
+            print('%9.1f ms %9.1f ms  %s' % (cumulative_us / 1000., self_us / 1000., name))
+
+
+if __name__ == '__main__':
+    main()
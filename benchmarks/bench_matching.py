@@ -0,0 +1,84 @@
+"""
+This script compares the matching module with the per-result fuzz.ratio loop
+    that load_movie used to run, on thousands of generated candidate titles.
+
+Run it from the project folder:
+
+    $ python3 benchmarks/bench_matching.py --candidates 5000 --queries 50
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from fuzzywuzzy import fuzz  # noqa: E402
+from dvdnetflix import matching  # noqa: E402
+
+WORDS = ['the', 'night', 'of', 'living', 'dead', 'alice', 'in', 'wonderland',
+         'return', 'king', 'star', 'wars', 'empire', 'strikes', 'back', 'love',
+         'story', 'halloween', 'deliverance', 'and', 'city', 'lights', 'dark',
+         'knight', 'rises', 'blood', 'drive', 'house', 'cards', 'game', 'war']
+
+
+def make_candidates(count, seed=0):
+    """This function returns a list of random (name, year, url) tuples."""
+    rng = random.Random(seed)
+    candidates = []
+    for index in range(count):
+        name = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 5))).title()
+        year = rng.randint(1930, 2017)
+        candidates.append((name, year, 'https://dvd.netflix.com/Movie/' + str(index)))
+    return candidates
+
+
+def legacy_loop(search_name, search_year, results):
+    """This function is the matching loop load_movie used to run, without early exit."""
+    matches = []
+    for result_name, result_year, result_url in results:
+        if fuzz.ratio(search_name.lower(), result_name.lower()) < 80:
+            continue
+        if search_year and abs(result_year - search_year) >= 2:
+            continue
+        matches.append(result_url)
+    return matches
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--candidates', type=int, default=5000)
+    parser.add_argument('--queries', type=int, default=50)
+    args = parser.parse_args()
+
+    candidates = make_candidates(args.candidates)
+    rng = random.Random(1)
+    queries = [(name, year + rng.randint(-1, 1))
+               for name, year, _ in rng.sample(candidates, args.queries)]
+
+    legacy = timed(lambda: [legacy_loop(name, year, candidates)
+                            for name, year in queries])
+    single = timed(lambda: [matching.rank(name, candidates, year, min_score=80,
+                                          max_year_diff=1)
+                            for name, year in queries])
+    batched = timed(matching.rank_many, queries, candidates, 80, 1)
+
+    print('candidates: %d, queries: %d, accelerated: %s'
+          % (args.candidates, args.queries, matching.ACCELERATED))
+    for label, seconds in [('fuzz.ratio loop', legacy),
+                           ('matching.rank', single),
+                           ('matching.rank_many', batched)]:
+        print('%-20s %8.3f s  %8.2f ms/query  %6.1fx'
+              % (label, seconds, 1000 * seconds / args.queries, legacy / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""
+This script checks that the NfoEditor keeps the bytes it doesn't edit.
+
+It edits .nfo files with comments, unknown tags and LF or CRLF line breaks,
+    saves them, and checks that the saved file reads back with the edited
+    text, and that every line that wasn't edited is unchanged and in order.
+    It exits with an error if any check fails.
+
+    $ python3 benchmarks/bench_nfo_editor.py
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+from xml.parsers import expat
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dvdnetflix.nfo_editor import NfoEditor  # noqa: E402
+from bench_governor import Checks  # noqa: E402
+
+NFO = '''<?xml version="1.0" encoding="UTF-8" standalone="yes" ?>
+<!-- written by a scraper, edited by hand -->
+<movie>
+    <title>Deliverance &amp; Co</title>
+    <rating>6.400000</rating>
+    <votes>1200</votes>
+    <outline></outline>
+    <plot>An old plot.</plot>
+    <plot/>
+    <genre>Drama</genre>
+    <genre>Thriller</genre>
+    <fileinfo><streamdetails><video><codec>h264</codec></video></streamdetails></fileinfo>
+    <actor>
+        <name>Jon Voight</name>
+        <role>Ed</role>
+    </actor>
+</movie>
+'''
+
+
+def write(folder, name, text, newline):
+    """This function writes text to a file with the newline, and returns its path."""
+    path = os.path.join(folder, name)
+    with open(path, 'wb') as f:
+        f.write(text.replace('\n', newline).encode('utf-8'))
+    return path
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def kept_lines(data, dropped):
+    """This function returns the lines of data without those containing any of dropped."""
+    return [line for line in data.splitlines(True)
+            if not any(part in line for part in dropped)]
+
+
+def check_round_trip(checks, folder, name, newline, edit, texts, edited):
+    """
+    This function edits and saves a copy of NFO, and checks the result.
+
+    edit: function making the edits on an NfoEditor
+    texts: dict of element names to the list of their texts after the edits
+    edited: list of bytes, the lines containing any of them were edited
+    """
+    path = write(folder, name + '.nfo', NFO, newline)
+    before = read(path)
+    try:
+        editor = NfoEditor(path)
+        edit(editor)
+        editor.save()
+    except Exception as error:
+        checks.expect(name + ' saved', False, '(%s: %s)' % (type(error).__name__, error))
+        return
+    after = read(path)
+    try:
+        expat.ParserCreate().Parse(after, True)
+        well_formed = True
+    except expat.ExpatError:
+        well_formed = False
+    checks.expect(name + ' is well formed', well_formed)
+    if not well_formed:
+        return
+    saved = NfoEditor(path)
+    found = {element: saved.find_all_text(element) for element in texts}
+    checks.expect(name + ' has the edited text', found == texts, '(%r)' % found)
+    checks.expect(name + ' kept the other lines',
+                  kept_lines(before, edited) == kept_lines(after, edited))
+    checks.expect(name + ' kept the line breaks',
+                  after.count(b'\r\n') == (after.count(b'\n') if newline == '\r\n' else 0))
+
+
+def run_checks(folder):
+    """This function runs every check, and returns a list of the failed ones."""
+    checks = Checks()
+    for newline, suffix in (('\n', 'lf'), ('\r\n', 'crlf')):
+        def remove_then_append(editor):
+            editor.remove('genre')
+            editor.append('outline', 'A new outline.')
+
+        check_round_trip(checks, folder, 'remove then append ' + suffix, newline,
+                         remove_then_append,
+                         {'genre': [], 'outline': ['', 'A new outline.']},
+                         [b'<genre>', b'<outline>A new'])
+
+        def remove_then_set(editor):
+            editor.remove('genre')
+            editor.set_text('genre', 'Action & Adventure')
+            editor.set_text('dvd-netflix-url', 'https://dvd.netflix.com/Movie/1')
+
+        check_round_trip(checks, folder, 'remove then set ' + suffix, newline,
+                         remove_then_set,
+                         {'genre': ['Action & Adventure'],
+                          'dvd-netflix-url': ['https://dvd.netflix.com/Movie/1']},
+                         [b'<genre>', b'<dvd-netflix-url>'])
+
+        def set_and_remove(editor):
+            editor.set_text('plot', 'A <new> plot.')
+            editor.set_text('votes', '1200')
+            editor.remove('genre', keep_first=True)
+            editor.append('tag', 'dropped before saving')
+            editor.remove('tag')
+
+        check_round_trip(checks, folder, 'set and remove ' + suffix, newline,
+                         set_and_remove,
+                         {'plot': ['A <new> plot.', ''], 'genre': ['Drama'],
+                          'votes': ['1200'], 'tag': []},
+                         [b'<plot>', b'<genre>Thriller'])
+    return checks.failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.parse_args()
+    with tempfile.TemporaryDirectory() as folder:
+        failures = run_checks(folder)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
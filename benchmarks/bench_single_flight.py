@@ -0,0 +1,143 @@
+"""
+This script checks that shared loads can't deadlock on a bounded browser pool.
+
+It runs against the local stand-in site in fixture_server.py, with a fetcher
+    that, like a SeleniumFetcher leasing from a DriverPool of one browser,
+    holds its only browser from the first fetch of a session() to its end.
+    One thread looks a title up while another fetches the title's page, so
+    the page load is shared between them.  The check fails if either load
+    doesn't finish, or fails.
+
+    $ python3 benchmarks/bench_single_flight.py --rounds 5
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+from contextlib import contextmanager
+from urllib.request import urlopen
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dvdnetflix.scraper import NetflixSession  # noqa: E402
+from dvdnetflix.fetchers import Fetcher  # noqa: E402
+from dvdnetflix.errors import FetchTimeout  # noqa: E402
+from dvdnetflix.page_cache import normalize_url  # noqa: E402
+from fixture_server import Catalog, start_server  # noqa: E402
+from bench_governor import Checks  # noqa: E402
+
+
+class OneBrowserFetcher(Fetcher):
+    """
+    This is a fetcher standing in for a browser pool of one: the browser is
+        leased by the first fetch of a session() and held until it ends.
+        Search pages load slowly, so a search holds the browser for a while.
+    """
+
+    def __init__(self, search_latency=.3, lease_timeout=5.):
+        """
+        search_latency: seconds added to every search page
+        lease_timeout: seconds a fetch waits for the browser before failing,
+                        so a deadlock fails the check instead of hanging it
+        """
+        self.search_latency = search_latency
+        self.lease_timeout = lease_timeout
+        self._browser = threading.BoundedSemaphore(1)
+        self._local = threading.local()
+
+    @contextmanager
+    def session(self):
+        if getattr(self._local, 'open', False):
+            yield self
+            return
+        self._local.open, self._local.leased = True, False
+        try:
+            yield self
+        finally:
+            if self._local.leased:
+                self._browser.release()
+            self._local.open = self._local.leased = False
+
+    def fetch(self, url, marker=None):
+        with self.session():
+            if not self._local.leased:
+                if not self._browser.acquire(timeout=self.lease_timeout):
+                    raise FetchTimeout('No browser was free for ' + url)
+                self._local.leased = True
+            if '/Search' in url:
+                time.sleep(self.search_latency)
+            with urlopen(url) as response:
+                return response.read().decode('utf-8')
+
+
+def unique_titles(catalog):
+    """This function returns the titles whose name no other title has."""
+    names = [title['name'].lower() for title in catalog.titles.values()]
+    return [title for title in catalog.titles.values()
+            if names.count(title['name'].lower()) == 1]
+
+
+def check_shared_page_load(checks, title, base_url, timeout=15.):
+    """
+    This function looks a title up in one thread, while another thread fetches
+        its page once the first holds the browser for the search.
+    """
+    session = NetflixSession('./no-cookies.json', fetcher=OneBrowserFetcher(),
+                             base_url=base_url, fragments=True)
+    url = base_url + '/Movie/' + title['slug'] + '/' + title['id']
+    results = {}
+
+    def run(key, function, *args):
+        try:
+            results[key] = function(*args)
+        except Exception as error:
+            results[key] = error
+
+    threads = [threading.Thread(target=run, args=('lookup', session.lookup,
+                                                  title['name'], title['year'])),
+               threading.Thread(target=run, args=('fetch', session.fetch, url))]
+    threads[0].start()
+    # the fetch starts while the lookup is searching, and leads the page load
+    time.sleep(.1)
+    threads[1].start()
+    for thread in threads:
+        thread.join(timeout)
+    finished = not any(thread.is_alive() for thread in threads)
+    checks.expect('lookup and fetch of ' + title['name'] + ' finished', finished)
+    if finished:
+        errors = [str(result) for result in results.values()
+                  if isinstance(result, Exception)]
+        checks.expect('both loads succeeded', not errors, '; '.join(errors))
+        if not errors:
+            checks.expect('both loads found the same page',
+                          normalize_url(results['lookup'].url) == normalize_url(url))
+    session.close()
+
+
+def run_checks(catalog, base_url, rounds=3):
+    """This function runs the check on a few titles, and returns the failed ones."""
+    checks = Checks()
+    for title in unique_titles(catalog)[:rounds]:
+        check_shared_page_load(checks, title, base_url)
+    return checks.failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--titles', type=int, default=100)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    catalog = Catalog(args.titles)
+    server, base_url = start_server(catalog)
+    try:
+        failures = run_checks(catalog, base_url, args.rounds)
+    finally:
+        server.shutdown()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""
+This module contains a local stand-in for dvd.netflix.com, which serves the
+    recorded pages in benchmarks/fixtures for a generated catalog of titles.
+
+It can inject latency and failures (503 responses), so fetchers, retries and
+    the rate governor can be exercised offline.  To run it on its own:
+
+    $ python3 benchmarks/fixture_server.py --titles 10000 --port 8000
+"""
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, quote_plus
+from string import Template
+import threading
+import argparse
+import random
+import time
+import os
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+WORDS = ['night', 'living', 'dead', 'alice', 'wonderland', 'return', 'king',
+         'star', 'wars', 'empire', 'strikes', 'back', 'love', 'story', 'city',
+         'halloween', 'deliverance', 'lights', 'dark', 'knight', 'rises',
+         'blood', 'drive', 'house', 'cards', 'game', 'war', 'river', 'summer']
+GENRES = ['Dramas', 'Thrillers', 'Comedies', 'Action & Adventure',
+          'Sci-Fi & Fantasy', 'Horror', 'Children & Family', 'Classics',
+          'Romantic Dramas', 'Cult Movies', 'TV Shows', 'Crime/Gangster']
+MOODS = ['Suspenseful', 'Dark', 'Exciting', 'Imaginative', 'Gritty',
+         'Romantic', 'Witty', 'Understated']
+
+
+def load_template(name):
+    """This function returns a fixture file as a string Template."""
+    with open(os.path.join(FIXTURES, name)) as f:
+        return Template(f.read())
+
+
+class Catalog:
+    """This is a class holding a reproducible set of generated titles."""
+
+    def __init__(self, size=1000, seed=0):
+        rng = random.Random(seed)
+        self.titles = {}
+        self._by_name = {}
+        self._by_word = {}
+        for index in range(size):
+            words = [rng.choice(WORDS) for _ in range(rng.randint(1, 4))]
+            name = ' '.join(words).title()
+            title = {
+                'id': str(60000000 + index),
+                'name': name,
+                'slug': name.replace(' ', '-'),
+                'year': rng.randint(1930, 2017),
+                'synopsis': 'A recorded synopsis for ' + name + '. ' * rng.randint(1, 3),
+                'genres': ', '.join(rng.sample(GENRES, rng.randint(2, 6))),
+                'moods': ', '.join(rng.sample(MOODS, rng.randint(1, 3))),
+                'guess_rating': str(round(rng.uniform(1, 5), 1)),
+                'avg_rating': str(round(rng.uniform(1, 5), 1)),
+                'num_votes': str(rng.randint(10, 500000)),
+            }
+            self.titles[title['id']] = title
+            self._by_name.setdefault(name.lower(), []).append(title)
+            self._by_word.setdefault(words[0], []).append(title)
+
+    def search(self, query, limit=20):
+        """This method returns the titles shown on the search page for a query."""
+        query = query.lower().strip()
+        results = list(self._by_name.get(query, []))
+        for title in self._by_word.get(query.split(' ')[0] if query else '', []):
+            if len(results) >= limit:
+                break
+            if title not in results:
+                results.append(title)
+        return results[:limit]
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """This is a request handler serving search and movie pages."""
+
+    catalog = None
+    # search results are split into pages of this many, up to search_pages
+    page_size = 20
+    search_pages = 3
+    latency = 0.
+    failure_rate = 0.
+    search_page = load_template('search.html')
+    search_result = load_template('search_result.html')
+    movie_page = load_template('movie.html')
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(random.uniform(.5, 1.5) * self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            self._send(503, '<html><body>Service Unavailable</body></html>')
+            return
+        url = urlsplit(self.path)
+        parts = url.path.strip('/').split('/')
+        if parts[0] == 'Search':
+            params = parse_qs(url.query)
+            page = int(params.get('pn', ['1'])[0])
+            self._send(200, self.render_search(params.get('v1', [''])[0], page))
+        elif parts[0] == 'Movie' and len(parts) == 3 and parts[2] in self.catalog.titles:
+            self._send(200, self.render_movie(self.catalog.titles[parts[2]]))
+        else:
+            self._send(404, '<html><body>Page not found</body></html>')
+
+    def render_search(self, query, page=1):
+        titles = self.catalog.search(query, self.page_size * self.search_pages)
+        start = (page - 1) * self.page_size
+        results = ''.join(self.search_result.substitute(title, trackid=index)
+                          for index, title in enumerate(
+                              titles[start:start + self.page_size], start))
+        pages = max(1, -(-len(titles) // self.page_size))
+        links = ''.join('<span class="current">%d</span>' % number if number == page
+                        else '<a href="/Search?v1=%s&amp;pn=%d">%d</a>'
+                        % (quote_plus(query), number, number)
+                        for number in range(1, pages + 1))
+        return self.search_page.substitute(query=query, results=results,
+                                           pagination=links)
+
+    def render_movie(self, title):
+        others = self.catalog.search(title['name'].split(' ')[0], limit=8)
+        more = ''.join(self.search_result.substitute(other, trackid=index)
+                       for index, other in enumerate(others))
+        return self.movie_page.substitute(title, more_like_this=more)
+
+
+def start_server(catalog, port=0, latency=0., failure_rate=0.):
+    """
+    This function starts the server in a background thread, and returns the
+        server and its base url.  Call server.shutdown() to stop it.
+
+    latency: average seconds added to every response
+    failure_rate: fraction of requests answered with a 503
+    """
+    handler = type('Handler', (FixtureHandler,), {
+        'catalog': catalog, 'latency': latency, 'failure_rate': failure_rate})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, 'http://127.0.0.1:' + str(server.server_address[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--titles', type=int, default=1000)
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.)
+    parser.add_argument('--failure-rate', type=float, default=0.)
+    args = parser.parse_args()
+    server, base_url = start_server(Catalog(args.titles), args.port,
+                                    args.latency, args.failure_rate)
+    print('Serving ' + str(args.titles) + ' titles on ' + base_url)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+"""
+This script times the scraper offline against the local stand-in site in
+    fixture_server.py, and the .nfo helpers against generated Kodi files.
+
+It times load_movie, load_movie_with_url, every get_* method, result matching
+    and each update_* helper, and runs the rate governor checks of
+    bench_governor.py.  It writes the results to a JSON file, and exits with
+    an error if any benchmark is slower than its threshold or a check fails.
+
+    $ python3 benchmarks/run.py --titles 1000 --out bench-results.json
+    $ python3 benchmarks/run.py --titles 10000 --baseline bench-results.json
+"""
+
+import os
+import sys
+import json
+import time
+import pickle
+import random
+import shutil
+import argparse
+import tempfile
+import platform
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+from dvdnetflix.scraper import NetflixSession  # noqa: E402
+from dvdnetflix.fetchers import HttpFetcher  # noqa: E402
+from dvdnetflix.movie_record import (  # noqa: E402
+    parse_html, parse_movie_fragments, PARSER)
+from fixture_server import Catalog, start_server, load_template  # noqa: E402
+from bench_governor import run_checks  # noqa: E402
+from dvdnetflix import update_nfo_file, instrumentation, matching  # noqa: E402
+
+GETTERS = ['get_movie_url', 'get_synopsis', 'get_genres', 'get_moods',
+           'get_guess_rating', 'get_avg_rating', 'get_num_votes',
+           'get_image_link', 'get_movie_name', 'get_movie_year']
+
+
+class Timer:
+    """This is a class collecting the timing of each benchmark."""
+
+    def __init__(self):
+        self.results = {}
+
+    def time(self, name, function, items):
+        """This method calls function on each item, and records the timing."""
+        items = list(items)
+        start = time.perf_counter()
+        for item in items:
+            function(item)
+        seconds = time.perf_counter() - start
+        self.results[name] = {'ops': len(items), 'seconds': seconds,
+                              'ms_per_op': 1000. * seconds / max(len(items), 1)}
+        print('%-32s %7d ops %9.3f s %9.3f ms/op'
+              % (name, len(items), seconds, self.results[name]['ms_per_op']))
+
+
+def make_session(base_url, folder):
+    """This function returns a signed in session fetching from the local site."""
+    cookies_file = os.path.join(folder, 'cookie.pkl')
+    with open(cookies_file, 'wb') as f:
+        pickle.dump([], f)
+    return NetflixSession(cookies_file, fetcher=HttpFetcher(), base_url=base_url)
+
+
+def make_library(catalog, folder, size):
+    """This function writes a .nfo file for size titles, and returns their paths."""
+    templates = {'movie': load_template('movie.nfo'),
+                 'tvshow': load_template('tvshow.nfo')}
+    paths = []
+    for index, title in enumerate(list(catalog.titles.values())[:size]):
+        kind = 'tvshow' if index % 5 == 0 else 'movie'
+        name = title['slug'] + '-' + title['id']
+        os.makedirs(os.path.join(folder, kind, name))
+        if kind == 'movie':
+            path = update_nfo_file.movie_nfo_path(folder + '/movie/', name)
+        else:
+            path = update_nfo_file.tvshow_nfo_path(folder + '/tvshow/', name)
+        with open(path, 'w') as f:
+            f.write(templates[kind].substitute(title, votes=int(title['num_votes']) // 2))
+        paths.append(path)
+    return paths
+
+
+def bench_session(timer, catalog, base_url, folder, loads):
+    """This function times the loads, getters and matching of NetflixSession."""
+    session = make_session(base_url, folder)
+    titles = random.Random(0).sample(list(catalog.titles.values()),
+                                     min(loads, len(catalog.titles)))
+    urls = [base_url + '/Movie/' + t['slug'] + '/' + t['id'] for t in titles]
+
+    timer.time('load_movie', lambda t: session.load_movie(
+        t['name'], t['year'], interactive=False), titles)
+    timer.time('load_movie_with_url', session.load_movie_with_url, urls)
+
+    # parsing the whole page, and only the elements that are scraped
+    htmls = [session.fetcher.fetch(url) for url in urls[:100]]
+    timer.time('parse_page', parse_html, htmls)
+    timer.time('parse_fragments', parse_movie_fragments, htmls)
+
+    # time each getter on freshly loaded pages, so nothing is cached yet
+    pages = [parse_html(html) for html in htmls]
+
+    def fresh(page):
+        session.movie_page, session.record = page, None
+        session.movie_name = session.movie_year = None
+    for getter in ['extract'] + GETTERS:
+        def call(page, getter=getter):
+            fresh(page)
+            getattr(session, getter)()
+        timer.time(getter, call, pages)
+
+    def all_getters(page):
+        fresh(page)
+        for getter in GETTERS:
+            getattr(session, getter)()
+    timer.time('all_getters', all_getters, pages)
+
+    # matching, first per search page, then the whole library at once
+    searches = [(t['name'], t['year'], [(r['name'], r['year'], r['id'])
+                                        for r in catalog.search(t['name'])])
+                for t in titles]
+    timer.time('match_search_results', lambda s: matching.best_match(
+        s[0], s[2], s[1], min_score=80, max_year_diff=1), searches)
+    candidates = [(t['name'], t['year'], t['id']) for t in catalog.titles.values()]
+    queries = [(t['name'], t['year']) for t in titles[:20]]
+    timer.time('match_library_batch', lambda q: matching.rank_many(
+        q, candidates, 80, 1), [queries])
+    session.close()
+
+
+def bench_nfo(timer, catalog, folder, size):
+    """This function times reading .nfo files and each update_* helper."""
+    paths = make_library(catalog, folder, size)
+    titles = list(catalog.titles.values())
+    record_for = {path: titles[index] for index, path in enumerate(paths)}
+
+    timer.time('read_nfo', update_nfo_file.read_nfo, paths)
+
+    def edit(helper):
+        def run(path):
+            title = record_for[path]
+            nfo = update_nfo_file.read_nfo(path)
+            helper(nfo, title)
+            update_nfo_file.write_nfo(path, nfo)
+        return run
+
+    timer.time('update_plot', edit(lambda nfo, t: update_nfo_file.update_plot(
+        nfo, t['synopsis'])), paths)
+    timer.time('update_outline', edit(lambda nfo, t: update_nfo_file.update_outline(
+        nfo, t['synopsis'])), paths)
+    timer.time('update_genre_moods', edit(lambda nfo, t: update_nfo_file.update_genre_moods(
+        nfo, t['genres'].split(', '), t['moods'].split(', '))), paths)
+    timer.time('update_rating', edit(lambda nfo, t: update_nfo_file.update_rating(
+        nfo, float(t['avg_rating']), int(t['num_votes']))), paths)
+    timer.time('add_netflix_tag', edit(lambda nfo, t: update_nfo_file.add_netflix_tag_movie(
+        nfo, 'https://dvd.netflix.com/Movie/' + t['slug'] + '/' + t['id'])), paths)
+
+
+def check(results, thresholds, baseline=None, tolerance=1.25):
+    """
+    This function returns a list of regressions: benchmarks slower than their
+        threshold (ms/op), or than tolerance times the baseline's ms/op.
+    """
+    regressions = []
+    for name, result in sorted(results.items()):
+        limit = thresholds.get(name)
+        if limit is not None and result['ms_per_op'] > limit:
+            regressions.append('%s: %.3f ms/op > threshold %.3f'
+                               % (name, result['ms_per_op'], limit))
+        if baseline and name in baseline:
+            previous = baseline[name]['ms_per_op']
+            if result['ms_per_op'] > tolerance * previous:
+                regressions.append('%s: %.3f ms/op > %.2f x baseline %.3f'
+                                   % (name, result['ms_per_op'], tolerance, previous))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--titles', type=int, default=1000,
+                        help='size of the catalog and of the .nfo library')
+    parser.add_argument('--loads', type=int, default=200,
+                        help='number of pages loaded through the local site')
+    parser.add_argument('--out', default='bench-results.json')
+    parser.add_argument('--thresholds', default=os.path.join(HERE, 'thresholds.json'))
+    parser.add_argument('--baseline', help='results file of an earlier run')
+    parser.add_argument('--tolerance', type=float, default=1.25)
+    parser.add_argument('--phases', action='store_true',
+                        help='also record the time spent in each phase')
+    parser.add_argument('--no-governor', action='store_true',
+                        help='skip the rate governor checks')
+    args = parser.parse_args()
+    if args.phases:
+        instrumentation.enable()
+
+    catalog = Catalog(args.titles)
+    server, base_url = start_server(catalog)
+    folder = tempfile.mkdtemp(prefix='dvdnetflix-bench-')
+    timer = Timer()
+    governor_failures = []
+    try:
+        bench_session(timer, catalog, base_url, folder, args.loads)
+        bench_nfo(timer, catalog, folder, args.titles)
+        if not args.no_governor:
+            governor_failures = run_checks(catalog, server, base_url)
+    finally:
+        server.shutdown()
+        shutil.rmtree(folder)
+
+    with open(args.thresholds) as f:
+        thresholds = json.load(f)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    regressions = check(timer.results, thresholds, baseline, args.tolerance)
+    regressions += ['governor: ' + failure for failure in governor_failures]
+
+    with open(args.out, 'w') as f:
+        json.dump({'meta': {'titles': args.titles, 'loads': args.loads,
+                            'parser': PARSER, 'accelerated': matching.ACCELERATED,
+                            'python': platform.python_version(),
+                            'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+                   'results': timer.results,
+                   'phases': instrumentation.snapshot() if args.phases else None,
+                   'regressions': regressions}, f, indent=2, sort_keys=True)
+    print('Results written to ' + args.out)
+    for regression in regressions:
+        print('REGRESSION ' + regression)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
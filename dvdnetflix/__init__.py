@@ -0,0 +1,9 @@
+"""
+This package contains the DVD Netflix scraper, and the tools updating Kodi
+    .nfo files with it.  Import the module you need, e.g.
+
+    >>> from dvdnetflix.scraper import NetflixSession
+
+Modules only import their heavy dependencies (selenium, bs4, requests) once
+    they need them, so this package imports nothing itself.
+"""
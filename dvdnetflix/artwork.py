@@ -0,0 +1,225 @@
+"""
+This module contains the ArtworkDownloader class, which saves the image of
+    each title (see NetflixSession.get_image_link) into the title's folder.
+
+Downloads run on a bounded pool of threads.  The ETag and Last-Modified of
+    every image are kept in SQLite, so refreshing the art of a whole library
+    mostly costs conditional requests answered with 304 Not Modified, and an
+    image whose content didn't change is never rewritten.  Resized variants
+    are made in a process pool when Pillow is installed.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from collections import Counter
+import threading
+import tempfile
+import hashlib
+import logging
+import sqlite3
+import time
+import os
+
+
+def atomic_write(path, data):
+    """
+    This function writes data through a temporary file in the same folder,
+        which then replaces path, so a crash never leaves a truncated image.
+    """
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                     prefix='.art-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def make_variants(path, variants):
+    """
+    This function writes resized copies of the image at path, and returns the
+        list of paths written.  It runs in a worker process.
+
+    variants: dictionary of file name to (width, height) the copy fits in
+    """
+    from PIL import Image
+    written = []
+    with Image.open(path) as image:
+        image.load()
+        for name, size in sorted(variants.items()):
+            copy = image.copy()
+            copy.thumbnail(size)
+            variant_path = os.path.join(os.path.dirname(path), name)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path),
+                                             prefix='.art-', suffix='.tmp')
+            os.close(fd)
+            try:
+                copy.convert('RGB').save(temp_path, 'JPEG', quality=90)
+                os.chmod(temp_path, 0o644)
+                os.replace(temp_path, variant_path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+            written.append(variant_path)
+    return written
+
+
+class ArtworkDownloader:
+    """
+    This is a class that downloads images concurrently, with conditional
+        requests and content hashes so unchanged images aren't written again.
+
+    Use it as a context manager, so pending downloads are finished on exit:
+
+        with ArtworkDownloader(variants={'landscape-small.jpg': (480, 270)}) as art:
+            art.submit(session.get_image_link(), '/path/to/TV/Blood Drive')
+    """
+
+    def __init__(self, state_path='./artwork.sqlite', filename='landscape.jpg',
+                 max_workers=8, variants=None, resize_workers=None, timeout=20):
+        """
+        state_path: string of path to the SQLite file of ETags and hashes
+        filename: name of the image file written into each title's folder
+        max_workers: number of images downloaded at once
+        variants: dictionary of file name to (width, height) of resized
+                    copies made next to each new image (needs Pillow)
+        resize_workers: number of processes resizing images (defaults to
+                    cpu count)
+        timeout: seconds to wait for a response
+        """
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.filename = filename
+        self.variants = variants
+        self.timeout = timeout
+        self.counts = Counter()
+        self.client = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.client.mount('http://', adapter)
+        self.client.mount('https://', adapter)
+        self._executor = ThreadPoolExecutor(max_workers)
+        # only keep a few downloads queued, so a huge library isn't submitted at once
+        self._slots = threading.BoundedSemaphore(2 * max_workers)
+        self._resizer = None
+        if variants:
+            try:
+                import PIL  # noqa: F401
+                self._resizer = ProcessPoolExecutor(resize_workers)
+            except ImportError:
+                logging.warning('Pillow is not installed, so images are not resized')
+        self._resizes = []
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(state_path, check_same_thread=False)
+        self._db.execute('''
+            CREATE TABLE IF NOT EXISTS artwork (
+                path TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                sha1 TEXT NOT NULL,
+                checked_at REAL NOT NULL)''')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _state(self, path):
+        with self._lock:
+            return self._db.execute(
+                'SELECT url, etag, last_modified, sha1 FROM artwork WHERE path = ?',
+                (path,)).fetchone()
+
+    def _remember(self, path, url, etag, last_modified, sha1):
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT OR REPLACE INTO artwork VALUES (?, ?, ?, ?, ?, ?)',
+                (path, url, etag, last_modified, sha1, time.time()))
+
+    def download(self, url, folder):
+        """
+        This method saves the image at url into folder, and returns
+            'downloaded', 'not modified' (the server answered 304),
+            'unchanged' (same content as the file) or 'failed'.
+        """
+        import requests
+        path = os.path.join(folder, self.filename)
+        state = self._state(path)
+        headers = {}
+        # the validators only apply to the same url, and the file must still exist
+        if state and state[0] == url and os.path.exists(path):
+            if state[1]:
+                headers['If-None-Match'] = state[1]
+            if state[2]:
+                headers['If-Modified-Since'] = state[2]
+        try:
+            response = self.client.get(url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304:
+                return self._count('not modified')
+            response.raise_for_status()
+        except requests.RequestException as error:
+            logging.error('Failed to download ' + url + ': ' + str(error))
+            return self._count('failed')
+
+        sha1 = hashlib.sha1(response.content).hexdigest()
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if state and state[3] == sha1 and os.path.exists(path):
+            self._remember(path, url, etag, last_modified, sha1)
+            return self._count('unchanged')
+        atomic_write(path, response.content)
+        self._remember(path, url, etag, last_modified, sha1)
+        logging.info('Saved ' + url + ' to ' + path)
+        if self._resizer is not None:
+            with self._lock:
+                self._resizes.append(self._resizer.submit(make_variants, path,
+                                                          self.variants))
+        return self._count('downloaded')
+
+    def _count(self, status):
+        with self._lock:
+            self.counts[status] += 1
+        return status
+
+    def submit(self, url, folder):
+        """
+        This method downloads the image in the background, and returns a
+            Future of the status.  It blocks while too many are queued.
+        """
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(self.download, url, folder)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def download_many(self, items):
+        """
+        This method downloads the images of many titles, and returns a Counter
+            of the statuses.
+
+        items: iterable of (url, folder) tuples
+        """
+        futures = [self.submit(url, folder) for url, folder in items if url]
+        return Counter(future.result() for future in futures)
+
+    def close(self):
+        """This method waits for pending downloads and resizes, and releases everything."""
+        self._executor.shutdown(wait=True)
+        if self._resizer is not None:
+            for future in self._resizes:
+                try:
+                    future.result()
+                except Exception as error:
+                    logging.error('Failed to resize an image: ' + str(error))
+            self._resizer.shutdown(wait=True)
+        self.client.close()
+        with self._lock:
+            self._db.close()
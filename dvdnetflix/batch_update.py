@@ -0,0 +1,294 @@
+"""
+This module contains a non-interactive updater that walks a whole Movies and
+    TV folder, and updates the .nfo files concurrently.
+
+Instead of asking the user, an UpdatePolicy decides what to do with each
+    title: matches above a score are accepted, ambiguous titles are skipped
+    or queued to a review file, and ratings are only written when the number
+    of votes increased.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from collections import Counter
+from .scraper import NetflixSession
+from .cookie_store import CookieStore
+from .errors import NoMatchError
+from .job_journal import LeaseLost, default_owner
+from .rate_governor import shared_governor
+from .single_flight import SingleFlight
+from .titles import Title
+from . import instrumentation
+from . import update_nfo_file
+import threading
+import logging
+import json
+import time
+import os
+
+
+class UpdatePolicy:
+    """This is a class holding the decisions made in place of the prompts."""
+
+    def __init__(self, min_score=90, ambiguous='review',
+                 review_file='./review.jsonl', votes_must_increase=True,
+                 data_selections={'landscape': False,
+                                  'plot': False,
+                                  'outline': False,
+                                  'genre-moods': True,
+                                  'best-guess-rating': False,
+                                  'avg-rating': True,
+                                  'netflix-tag': True},
+                 artwork=None, record_store=None):
+        """
+        min_score: text score a search match needs to be accepted
+        ambiguous: 'review' to queue titles without a confident match to the
+                        review file, or 'skip' to ignore them
+        review_file: string of path to the JSON lines file of queued titles
+        votes_must_increase: if True, ratings are only written when the number
+                        of votes went up
+        data_selections: dictionary of data in .nfo file to be updated
+        artwork: an ArtworkDownloader saving the images when 'landscape' is
+                        selected, by default one is started for each run
+        record_store: a RecordStore every scraped record is added to
+        """
+        self.min_score = min_score
+        self.ambiguous = ambiguous
+        self.review_file = review_file
+        self.votes_must_increase = votes_must_increase
+        self.data_selections = data_selections
+        self.artwork = artwork
+        self.record_store = record_store
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def run_artwork(self):
+        """
+        This method gives the policy one ArtworkDownloader for the duration of
+            a run, if images are selected and no downloader was given, so all
+            titles share its connections and state.  Pending downloads are
+            finished on exit.
+        """
+        if self.artwork is not None or not self.data_selections.get('landscape'):
+            yield self.artwork
+            return
+        from .artwork import ArtworkDownloader
+        self.artwork = ArtworkDownloader()
+        try:
+            with self.artwork:
+                yield self.artwork
+        finally:
+            self.artwork = None
+
+    def queue_for_review(self, title, session=None, reason=None):
+        """This method appends an ambiguous title to the review file."""
+        if self.ambiguous != 'review':
+            return
+        entry = {'kind': title.kind, 'name': title.name,
+                 'nfo': title.nfo_path, 'reason': reason}
+        if session is not None and session.movie_url:
+            entry.update({'match_name': session.movie_name,
+                          'match_year': session.movie_year,
+                          'match_url': session.movie_url,
+                          'score': session.match_score})
+        with self._lock, open(self.review_file, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+
+
+def find_titles(movies_folder=None, tv_show_folder=None):
+    """
+    This function yields a Title for every movie and TV show folder that
+        contains a .nfo file.
+    """
+    for kind, folder in [('movie', movies_folder), ('tvshow', tv_show_folder)]:
+        if not folder:
+            continue
+        for name in sorted(os.listdir(folder)):
+            if kind == 'movie':
+                nfo_path = update_nfo_file.movie_nfo_path(folder, name)
+            else:
+                nfo_path = update_nfo_file.tvshow_nfo_path(folder, name)
+            if os.path.isfile(nfo_path):
+                yield Title(kind, name, nfo_path)
+
+
+def update_title(session, title, policy, fields=None, checkpoint=None):
+    """
+    This function updates the .nfo file of one title according to the policy,
+        and returns 'updated', 'unchanged' or 'ambiguous'.
+
+    fields: if given, only these data selections are updated
+    checkpoint: function called with 'fetched' once the title's page is
+                loaded, and 'parsed' before the .nfo file is written
+    """
+    nfo = update_nfo_file.read_nfo(title.nfo_path)
+    try:
+        if title.kind == 'movie':
+            update_nfo_file.load_movie(session, nfo, interactive=False)
+        else:
+            update_nfo_file.load_tvshow(session, nfo, title.name,
+                                        interactive=False)
+    except NoMatchError:
+        policy.queue_for_review(title, reason='no match')
+        return 'ambiguous'
+    if checkpoint is not None:
+        checkpoint('fetched')
+    # titles loaded by url have no match score, and are always accepted
+    if session.match_score is not None and session.match_score < policy.min_score:
+        policy.queue_for_review(title, session, reason='low score')
+        return 'ambiguous'
+
+    selections = policy.data_selections
+    if fields is not None:
+        selections = {key: value and key in fields
+                      for key, value in selections.items()}
+    record = session.extract()
+    if policy.record_store is not None:
+        policy.record_store.add(record, title.kind, title.nfo_path)
+    update_nfo_file.apply_selections(nfo, record, selections,
+                                     title.kind, policy.votes_must_increase,
+                                     policy.artwork)
+    if checkpoint is not None:
+        checkpoint('parsed')
+    if not nfo.changed:
+        return 'unchanged'
+    update_nfo_file.write_nfo(title.nfo_path, nfo)
+    return 'updated'
+
+
+class Progress:
+    """This is a class that reports throughput and progress of a batch."""
+
+    def __init__(self, total, every=10):
+        self.total = total
+        self.every = every
+        self.done = 0
+        self.counts = Counter()
+        self.start = time.time()
+
+    def update(self, status):
+        self.done += 1
+        self.counts[status] += 1
+        instrumentation.count('titles_' + status)
+        if self.done % self.every == 0 or self.done == self.total:
+            print(self.report())
+
+    def report(self):
+        """This method returns a line describing the progress so far."""
+        elapsed = time.time() - self.start
+        rate = self.done / elapsed if elapsed else 0.
+        remaining = (self.total - self.done) / rate if rate else 0.
+        counts = ', '.join(k + ': ' + str(v) for k, v in sorted(self.counts.items()))
+        return '%d/%d titles, %.2f titles/s, %.0f s left (%s)' % (
+            self.done, self.total, rate, remaining, counts)
+
+
+def update_library(movies_folder=None, tv_show_folder=None, policy=None,
+                   max_workers=4, cookies_file='./cookie.pkl', titles=None,
+                   report_every=10, manifest=None, governor=None, journal=None,
+                   owner=None):
+    """
+    This function updates every title in the movie and TV show folders on a
+        bounded pool of workers, and returns a Counter of the outcomes.
+
+    movies_folder: string of path to movies (each in its own folder)
+    tv_show_folder: string of path to TV shows (each in its own folder)
+    policy: an UpdatePolicy, defaults to UpdatePolicy()
+    max_workers: number of titles processed at once, and browsers kept alive
+    cookies_file: string of path to a JSON or pickle file containing cookies
+    titles: list of Titles to process instead of the folders' contents
+    report_every: number of titles between progress reports
+    manifest: a LibraryManifest, so only new, edited or stale titles are
+                updated, and only their stale fields
+    governor: the RateGovernor for all fetches, by default the shared one
+    journal: a JobJournal the titles are queued to and leased from, so a
+                stopped run continues where it stopped, and several
+                processes can share the work
+    owner: name of this worker in the journal, by default host:pid
+    """
+    policy = policy or UpdatePolicy()
+    if titles is None:
+        titles = list(find_titles(movies_folder, tv_show_folder))
+    if manifest is not None:
+        selected = [key for key, value in policy.data_selections.items() if value]
+        work_items = manifest.scan(titles, selected)
+        print('%d of %d titles need updating' % (len(work_items), len(titles)))
+    else:
+        work_items = [(title, None, None) for title in titles]
+    if journal is not None:
+        owner = owner or default_owner()
+        added = journal.enqueue(work_items)
+        print('%d titles queued, %d pending in the journal' % (added, journal.pending()))
+        progress = Progress(journal.pending(), report_every)
+    else:
+        progress = Progress(len(work_items), report_every)
+
+    # every worker thread has its own session, but they share the browsers
+    sessions = []
+    local = threading.local()
+    from .driver_pool import DriverPool
+    cookie_store = CookieStore(cookies_file)
+    pool = DriverPool(size=max_workers, cookie_store=cookie_store)
+    governor = governor or shared_governor()
+    # titles resolving to the same search or page share one load
+    flights = SingleFlight(keep=256)
+
+    def work(title, fields):
+        if not hasattr(local, 'session'):
+            local.session = NetflixSession(cookie_store=cookie_store,
+                                           driver_pool=pool,
+                                           governor=governor,
+                                           fragments=True,
+                                           single_flight=flights)
+            sessions.append(local.session)
+        checkpoint = None
+        if journal is not None:
+            def checkpoint(state, error=None):
+                journal.mark(title, state, owner, error)
+        try:
+            with instrumentation.span('update_title', kind=title.kind):
+                status = update_title(local.session, title, policy, fields,
+                                      checkpoint)
+            if manifest is not None and status in ('updated', 'unchanged'):
+                manifest.mark_scraped(title, fields, local.session.movie_url)
+            if checkpoint is not None:
+                checkpoint('review' if status == 'ambiguous' else 'written')
+            return status
+        except LeaseLost:
+            logging.warning('Lost the lease on ' + title.nfo_path + ' to another worker')
+            return 'lost'
+        except Exception as error:
+            logging.exception('Failed to update ' + title.nfo_path)
+            policy.queue_for_review(title, reason='error: ' + str(error))
+            if checkpoint is not None:
+                try:
+                    checkpoint('failed', '%s: %s' % (type(error).__name__, error))
+                except LeaseLost:
+                    return 'lost'
+            return 'failed'
+
+    def leased_items():
+        """This function leases titles from the journal until none are left."""
+        while True:
+            leases = journal.lease(owner, max_workers)
+            if not leases:
+                return
+            for lease in leases:
+                yield lease.title, None, lease.fields
+
+    with policy.run_artwork(), pool, ThreadPoolExecutor(max_workers) as executor:
+        # only keep a few titles queued, so a huge library isn't submitted at once
+        pending = set()
+        for title, _, fields in (work_items if journal is None else leased_items()):
+            if len(pending) >= 2 * max_workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    progress.update(future.result())
+            pending.add(executor.submit(work, title, fields))
+        for future in pending:
+            progress.update(future.result())
+        for session in sessions:
+            session.close()
+    if flights.saved():
+        print('%d loads were shared between titles' % flights.saved())
+    return progress.counts
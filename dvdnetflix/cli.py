@@ -0,0 +1,176 @@
+"""
+This module contains the dvdnetflix command, for cron jobs and media server
+    hooks.  Every command imports the scraper only once it needs it, so the
+    command starts quickly.
+
+    $ dvdnetflix lookup 'Alice in Wonderland' --year 1951
+    $ dvdnetflix update-movie 'Deliverance (1972)' --folder /path/to/Movies/ --auto
+    $ dvdnetflix update-tv 'Blood Drive' --folder /path/to/TV/
+    $ dvdnetflix refresh-ratings --movies /path/to/Movies/ --tv /path/to/TV/
+"""
+
+import argparse
+import sys
+
+
+def make_session(args):
+    """This function returns a NetflixSession configured by the common options."""
+    from .scraper import NetflixSession
+    cache = title_index = None
+    if args.cache:
+        from .page_cache import PageCache
+        cache = PageCache(args.cache)
+    if args.index:
+        from .title_index import TitleIndex
+        title_index = TitleIndex(args.index)
+    return NetflixSession(args.cookies, fetcher='http' if args.http else None,
+                          cache=cache, title_index=title_index,
+                          profile_dir=args.profile_dir, lean=args.lean)
+
+
+def lookup(args):
+    """This function prints the best match for a search, or its scraped data."""
+    from .errors import NoMatchError
+    import json
+    with make_session(args) as session:
+        try:
+            if not args.details:
+                match = session.resolve(args.name, args.year, interactive=False)
+                name, year, url = match.candidate
+                print('%d\t%s (%s)\t%s' % (match.text_score, name, year, url))
+                return 0
+            session.load_movie(args.name, args.year, interactive=False)
+        except NoMatchError:
+            print('No matching movies were found', file=sys.stderr)
+            return 1
+        record = session.extract()
+        print(json.dumps(dict(record._asdict(), score=session.match_score),
+                         indent=2))
+    return 0
+
+
+def update(args):
+    """
+    This function updates the .nfo file of one movie or TV show, asking the
+        user to verify the data unless --auto is given.
+    """
+    from . import update_nfo_file
+    if not args.auto:
+        with make_session(args) as session:
+            if args.kind == 'movie':
+                update_nfo_file.update_movie_nfo(args.name, args.url, args.folder,
+                                                 session=session)
+            else:
+                update_nfo_file.update_tvshow_nfo(args.name, args.url, args.folder,
+                                                  session=session)
+        return 0
+
+    from .batch_update import Title, UpdatePolicy, update_title
+    if args.kind == 'movie':
+        nfo_path = update_nfo_file.movie_nfo_path(args.folder, args.name)
+    else:
+        nfo_path = update_nfo_file.tvshow_nfo_path(args.folder, args.name)
+    policy = UpdatePolicy(min_score=args.min_score, review_file=args.review_file)
+    with make_session(args) as session:
+        status = update_title(session, Title(args.kind, args.name, nfo_path),
+                              policy)
+    print(nfo_path + ' ' + status)
+    return 1 if status == 'ambiguous' else 0
+
+
+def refresh(args):
+    """
+    This function refreshes the rating and votes of every title that has a
+        dvd-netflix-url tag, and prints the outcomes.
+    """
+    from .ratings_refresh import refresh_ratings
+    from .errors import NotSignedInError
+    # the pages are fetched over http, falling back to a browser
+    try:
+        counts = refresh_ratings(args.movies, args.tv, max_workers=args.workers,
+                                 cookies_file=args.cookies)
+    except NotSignedInError as error:
+        print(str(error), file=sys.stderr)
+        return 1
+    print(', '.join(k + ': ' + str(v) for k, v in sorted(counts.items())))
+    return 1 if counts['failed'] else 0
+
+
+def build_parser():
+    """This function returns the parser of the command line."""
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--cookies', default='./cookie.pkl',
+                        help='JSON or pickle (.pkl) file of cookies')
+    common.add_argument('--log', help='file to log to')
+    common.add_argument('--metrics',
+                        help='file to write phase timings to, in Prometheus format')
+
+    # the options of the session used by lookup and the updates
+    browsing = argparse.ArgumentParser(add_help=False)
+    browsing.add_argument('--http', action='store_true',
+                          help='fetch pages over http, falling back to a browser')
+    browsing.add_argument('--cache', help='folder of cached pages')
+    browsing.add_argument('--index', help='SQLite file of the local title index')
+    browsing.add_argument('--profile-dir', help='folder of persistent Chrome profiles')
+    browsing.add_argument('--lean', action='store_true',
+                          help="don't load images, fonts, media and third party hosts")
+
+    parser = argparse.ArgumentParser(
+        prog='dvdnetflix',
+        description='Look up titles on DVD Netflix, and update the Kodi .nfo '
+                    'files of a movie and TV show library.')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    lookup_parser = commands.add_parser('lookup', parents=[common, browsing],
+                                        help='find a movie or TV show')
+    lookup_parser.add_argument('name')
+    lookup_parser.add_argument('--year', type=int)
+    lookup_parser.add_argument('--details', action='store_true',
+                               help='load the page and print all scraped data')
+    lookup_parser.set_defaults(run=lookup)
+
+    for command, kind, name_help in [
+            ('update-movie', 'movie', 'movie folder name, e.g. "Deliverance (1972)"'),
+            ('update-tv', 'tvshow', 'TV show folder name')]:
+        update_parser = commands.add_parser(command, parents=[common, browsing],
+                                            help='update a .nfo file')
+        update_parser.add_argument('name', help=name_help)
+        update_parser.add_argument('--folder', required=True,
+                                   help='folder holding the title folders')
+        update_parser.add_argument('--url', help='direct link to the Netflix page')
+        update_parser.add_argument('--auto', action='store_true',
+                                   help="don't ask, accept confident matches only")
+        update_parser.add_argument('--min-score', type=int, default=90)
+        update_parser.add_argument('--review-file', default='./review.jsonl')
+        update_parser.set_defaults(run=update, kind=kind)
+
+    refresh_parser = commands.add_parser('refresh-ratings', parents=[common],
+                                         help='refresh the ratings of a library')
+    refresh_parser.add_argument('--movies', help='folder holding the movie folders')
+    refresh_parser.add_argument('--tv', help='folder holding the TV show folders')
+    refresh_parser.add_argument('--workers', type=int, default=8,
+                                help='number of titles refreshed at once')
+    refresh_parser.set_defaults(run=refresh)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, 'auto', False) and args.url:
+        parser.error('--url is only used without --auto')
+    from . import instrumentation
+    if args.log:
+        instrumentation.configure_logging(args.log)
+    if args.metrics:
+        instrumentation.enable()
+    try:
+        return args.run(args)
+    finally:
+        if args.metrics:
+            instrumentation.write_prometheus(args.metrics)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
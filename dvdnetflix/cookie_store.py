@@ -0,0 +1,179 @@
+"""
+This module contains the CookieStore class, which keeps the cookies of a
+    signed in Netflix session between runs.
+
+Cookies are kept in a JSON file (an EditThisCookie export can be saved as is),
+    or in the pickle file written by save_cookies_to_pickle.py.  Expired
+    cookies are dropped when loading, and the cookies the site sends back to
+    the browsers and the http client are captured, so the store stays fresh.
+"""
+
+import threading
+import hashlib
+import logging
+import pickle
+import json
+import time
+import os
+
+# name of the file a Chrome profile keeps the hash of its installed cookies in
+PROFILE_STAMP = 'dvdnetflix-cookies.sha1'
+
+
+def normalize_cookie(cookie):
+    """
+    This function returns a cookie in the format used by selenium, from an
+        EditThisCookie export or a cookie returned by selenium.
+    """
+    normalized = {'name': cookie['name'], 'value': cookie['value'],
+                  'domain': cookie.get('domain') or '.netflix.com',
+                  'path': cookie.get('path') or '/',
+                  'secure': bool(cookie.get('secure', False)),
+                  'httpOnly': bool(cookie.get('httpOnly', False))}
+    expiry = cookie.get('expiry', cookie.get('expirationDate'))
+    if expiry is not None and not cookie.get('session', False):
+        normalized['expiry'] = int(expiry)
+    return normalized
+
+
+def is_expired(cookie, now=None):
+    """This function checks if a cookie has expired.  Session cookies never do."""
+    expiry = cookie.get('expiry')
+    return expiry is not None and expiry <= (now or time.time())
+
+
+def is_persistent(cookie):
+    """
+    This function checks if a browser keeps a cookie after it quits, which
+        only cookies with an expiry are.
+    """
+    return cookie.get('expiry') is not None
+
+
+def cookies_hash(cookies):
+    """This function returns a hash identifying a list of cookies."""
+    key = sorted((c['domain'], c['path'], c['name'], c['value']) for c in cookies)
+    return hashlib.sha1(json.dumps(key).encode('utf-8')).hexdigest()
+
+
+class CookieStore:
+    """This is a class that loads, refreshes and saves a list of cookies."""
+
+    def __init__(self, path='./cookies.json'):
+        """
+        path: string of path to the cookie file, pickled if it ends in .pkl,
+                otherwise JSON
+        """
+        self.path = path
+        self.cookies = None
+        self._loaded = False
+        self._changed = False
+        self._lock = threading.Lock()
+
+    def get(self):
+        """This method returns the cookies, reading the file the first time."""
+        if not self._loaded:
+            self.load()
+        return self.cookies
+
+    def load(self, now=None):
+        """
+        This method reads the cookie file, and returns the list of cookies
+            that haven't expired, or None if there is no file or every cookie
+            in it has expired.
+        """
+        try:
+            if self.path.endswith('.pkl'):
+                with open(self.path, 'rb') as f:
+                    cookies = pickle.load(f)
+            else:
+                with open(self.path) as f:
+                    cookies = json.load(f)
+        except (IOError, ValueError):
+            logging.info('No cookies were loaded from ' + self.path)
+            self._loaded = True
+            return None
+        cookies = [normalize_cookie(cookie) for cookie in cookies]
+        fresh = [cookie for cookie in cookies if not is_expired(cookie, now)]
+        if len(fresh) < len(cookies):
+            logging.warning('%d of the cookies in %s have expired'
+                            % (len(cookies) - len(fresh), self.path))
+        if cookies and not fresh:
+            logging.error('Every cookie in ' + self.path + ' has expired')
+            fresh = None
+        else:
+            logging.info('Cookies loaded from ' + self.path)
+        with self._lock:
+            self.cookies = fresh
+            self._loaded = True
+        return fresh
+
+    def update(self, captured, now=None):
+        """
+        This method merges cookies captured from responses into the store,
+            replacing those with the same domain, path and name, and drops
+            expired ones.  It returns True if anything changed.
+        """
+        with self._lock:
+            if self.cookies is None:
+                return False
+            by_key = {(c['domain'], c['path'], c['name']): c for c in self.cookies}
+            for cookie in captured:
+                cookie = normalize_cookie(cookie)
+                key = (cookie['domain'], cookie['path'], cookie['name'])
+                if by_key.get(key) != cookie:
+                    by_key[key] = cookie
+                    self._changed = True
+            fresh = [c for c in by_key.values() if not is_expired(c, now)]
+            if len(fresh) < len(by_key):
+                self._changed = True
+            self.cookies = fresh
+            return self._changed
+
+    def capture_driver(self, driver):
+        """This method captures the current cookies of a webdriver."""
+        return self.update(driver.get_cookies())
+
+    def capture_jar(self, jar):
+        """This method captures the cookies of a requests cookie jar."""
+        return self.update({'name': cookie.name, 'value': cookie.value,
+                            'domain': cookie.domain, 'path': cookie.path,
+                            'secure': cookie.secure, 'expiry': cookie.expires,
+                            'httpOnly': cookie.has_nonstandard_attr('HttpOnly')}
+                           for cookie in jar)
+
+    def save(self):
+        """This method atomically rewrites the cookie file if the cookies changed."""
+        with self._lock:
+            if not self._changed:
+                return
+            temp_path = self.path + '.tmp'
+            if self.path.endswith('.pkl'):
+                with open(temp_path, 'wb') as f:
+                    pickle.dump(self.cookies, f)
+            else:
+                with open(temp_path, 'w') as f:
+                    json.dump(self.cookies, f, indent=2)
+            os.replace(temp_path, self.path)
+            self._changed = False
+        logging.info('Cookies saved to ' + self.path)
+
+
+def profile_has_cookies(profile_dir, cookies):
+    """
+    This function checks if a persistent Chrome profile already holds the
+        persistent cookies of this list, so they don't need to be installed
+        again.  Session cookies are never kept by the profile.
+    """
+    try:
+        with open(os.path.join(profile_dir, PROFILE_STAMP)) as f:
+            return f.read() == cookies_hash(filter(is_persistent, cookies))
+    except IOError:
+        return False
+
+
+def mark_profile(profile_dir, cookies):
+    """This function records that a Chrome profile holds the persistent cookies of a list."""
+    os.makedirs(profile_dir, exist_ok=True)
+    with open(os.path.join(profile_dir, PROFILE_STAMP), 'w') as f:
+        f.write(cookies_hash(filter(is_persistent, cookies)))
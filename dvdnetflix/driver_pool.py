@@ -0,0 +1,319 @@
+"""This module contains the DriverPool class."""
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from contextlib import contextmanager
+from .cookie_store import profile_has_cookies, mark_profile, is_persistent
+from . import instrumentation
+import threading
+import logging
+import os
+
+# hosts a lean browser may load from, any other (third party) host is blocked
+LEAN_HOSTS = ('dvd.netflix.com', '*.netflix.com', '*.nflxext.com')
+
+# url patterns a lean browser doesn't download: images, fonts and media
+LEAN_BLOCKED_URLS = ['*.jpg', '*.jpeg', '*.png', '*.gif', '*.webp', '*.svg',
+                     '*.ico', '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+                     '*.mp4', '*.webm', '*.m3u8', '*.mp3']
+
+
+def create_driver(executable_path='./chromedriver', headless=False,
+                  profile_dir=None, lean=False):
+    """
+    This function starts a new Chrome webdriver.
+
+    executable_path: string of path to the chromedriver binary
+    headless: if True, Chrome is started without opening a window
+    profile_dir: string of path to a persistent Chrome user data directory,
+                    which keeps cookies between launches
+    lean: if True, Chrome is started headless, driver.get returns once the
+            html is parsed (the eager page load strategy), and images, fonts,
+            media and third party hosts are blocked
+    """
+    options = webdriver.ChromeOptions()
+    capabilities = None
+    if headless or lean:
+        options.add_argument('--headless')
+        options.add_argument('--disable-gpu')
+    if profile_dir:
+        options.add_argument('--user-data-dir=' + os.path.abspath(profile_dir))
+    if lean:
+        options.add_argument('--blink-settings=imagesEnabled=false')
+        options.add_argument('--host-resolver-rules=MAP * ~NOTFOUND, ' +
+                             ', '.join('EXCLUDE ' + host for host in LEAN_HOSTS))
+        options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2})
+        capabilities = {'pageLoadStrategy': 'eager'}
+    with instrumentation.span('driver_start'):
+        driver = webdriver.Chrome(executable_path=executable_path,
+                                  chrome_options=options,
+                                  desired_capabilities=capabilities)
+    if lean:
+        block_urls(driver, LEAN_BLOCKED_URLS)
+    return driver
+
+
+def block_urls(driver, patterns):
+    """
+    This function makes the browser refuse requests to urls matching any of
+        the patterns, through the DevTools protocol.  Older chromedrivers
+        don't support this, and then only images and third party hosts are
+        blocked.
+    """
+    driver.command_executor._commands['send_command'] = (
+        'POST', '/session/$sessionId/chromium/send_command')
+    try:
+        driver.execute('send_command', {'cmd': 'Network.enable', 'params': {}})
+        driver.execute('send_command', {'cmd': 'Network.setBlockedURLs',
+                                        'params': {'urls': patterns}})
+    except WebDriverException:
+        logging.warning('This chromedriver cannot block fonts and media')
+
+
+def install_cookies(driver, cookies):
+    """
+    This function adds a list of cookies to the driver.  Selenium can only
+        add cookies for the domain that is currently loaded, so some
+        netflix page has to be loaded first.
+    """
+    with instrumentation.span('cookie_injection'):
+        driver.get('https://dvd.netflix.com/404')
+        for cookie in cookies:
+            driver.add_cookie(cookie)
+
+
+def start_driver(executable_path='./chromedriver', headless=False,
+                 cookies=None, profile_dir=None, lean=False):
+    """
+    This function starts a new Chrome webdriver with the cookies installed.
+        With a persistent profile that already holds the cookies, only the
+        session cookies, which Chrome drops when it quits, are installed
+        again, and without any the page load needed to install them is
+        skipped.
+    """
+    driver = create_driver(executable_path, headless, profile_dir, lean)
+    if cookies:
+        if profile_dir and profile_has_cookies(profile_dir, cookies):
+            session_cookies = [c for c in cookies if not is_persistent(c)]
+            if session_cookies:
+                install_cookies(driver, session_cookies)
+            else:
+                instrumentation.count('cookie_installs_skipped')
+        else:
+            install_cookies(driver, cookies)
+            if profile_dir:
+                mark_profile(profile_dir, cookies)
+    return driver
+
+
+def capture_cookies(driver, cookie_store, profile_dir=None):
+    """
+    This function saves the cookies the site sent to a driver in the cookie
+        store, before the driver is quit.
+    """
+    try:
+        cookie_store.capture_driver(driver)
+    except WebDriverException:
+        return
+    if profile_dir and cookie_store.cookies:
+        mark_profile(profile_dir, cookie_store.cookies)
+
+
+class DriverPool:
+    """
+    This is a class that keeps a number of warm webdrivers with the cookies
+        already installed, and leases them to NetflixSession loads.  It can be
+        owned by a single session or shared between several sessions.
+
+    Use it as a context manager so that all browsers are quit on exit:
+
+        with DriverPool(size=4, cookies=cookies) as pool:
+            session = NetflixSession(driver_pool=pool)
+
+    With a profile_dir, every browser slot keeps its own persistent Chrome
+        profile, so cookies are only installed the first time a slot is used.
+    """
+
+    def __init__(self, size=2, cookies=None, max_uses=50, headless=True,
+                 executable_path='./chromedriver', cookie_store=None,
+                 profile_dir=None, lean=False):
+        """
+        Create a pool of webdrivers.  Drivers are started lazily, the first
+            time they are needed, so an unused pool costs nothing.
+
+        size: maximum number of browsers kept alive at once
+        cookies: list of cookie dicts installed on every new driver
+        max_uses: number of leases after which a driver is quit and replaced
+        headless: if True, browsers are started without opening a window
+        executable_path: string of path to the chromedriver binary
+        cookie_store: a CookieStore whose current cookies are installed on
+                        new drivers (instead of cookies), and refreshed with
+                        each driver's cookies before it is quit
+        profile_dir: string of path to a folder holding one persistent Chrome
+                        profile per browser slot
+        lean: if True, browsers skip images, fonts, media and third party
+                hosts, see create_driver
+        """
+        if cookie_store is not None:
+            cookie_store.get()
+        self.size = size
+        self.cookies = cookies
+        self.max_uses = max_uses
+        self.headless = headless
+        self.executable_path = executable_path
+        self.cookie_store = cookie_store
+        self.profile_dir = profile_dir
+        self.lean = lean
+        self._free_slots = list(range(size))
+        self._slots = {}
+        self._idle = []
+        self._uses = {}
+        self._num_alive = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _start_driver(self):
+        """This method starts a new driver and installs the pool's cookies."""
+        with self._condition:
+            slot = self._free_slots.pop()
+        try:
+            cookies = self.cookies
+            if self.cookie_store is not None:
+                cookies = self.cookie_store.cookies
+            driver = start_driver(self.executable_path, self.headless,
+                                  cookies, self._profile(slot), self.lean)
+        except Exception:
+            with self._condition:
+                self._free_slots.append(slot)
+            raise
+        with self._condition:
+            self._uses[id(driver)] = 0
+            self._slots[id(driver)] = slot
+        logging.info('Driver pool started a new driver')
+        return driver
+
+    def _profile(self, slot):
+        """This method returns the profile folder of a browser slot, if any."""
+        if self.profile_dir:
+            return os.path.join(self.profile_dir, 'driver-' + str(slot))
+        return None
+
+    def _quit_driver(self, driver):
+        """
+        This method quits a driver, ignoring errors from a dead browser, and
+            then frees its place in the pool.  It's called without holding
+            the lock, so other leases aren't held up by the browser.
+        """
+        with self._condition:
+            self._uses.pop(id(driver), None)
+            slot = self._slots.pop(id(driver), None)
+        try:
+            if self.cookie_store is not None:
+                capture_cookies(driver, self.cookie_store, self._profile(slot))
+            try:
+                driver.quit()
+            except WebDriverException:
+                pass
+        finally:
+            # the slot's profile is only free once its browser has quit
+            with self._condition:
+                if slot is not None:
+                    self._free_slots.append(slot)
+                self._num_alive -= 1
+                self._condition.notify()
+
+    @staticmethod
+    def _is_healthy(driver):
+        """This method checks that the browser behind a driver still responds."""
+        try:
+            driver.current_url
+        except WebDriverException:
+            return False
+        return True
+
+    def acquire(self):
+        """
+        This method returns an idle driver, starting a new one if the pool
+            isn't full, or blocking until another lease is released.
+        """
+        while True:
+            with self._condition:
+                while True:
+                    if self._closed:
+                        raise RuntimeError('Driver pool is closed')
+                    if self._idle:
+                        driver = self._idle.pop()
+                        break
+                    elif self._num_alive < self.size:
+                        self._num_alive += 1
+                        driver = None
+                        break
+                    else:
+                        self._condition.wait()
+            # talk to the browsers outside of the lock, since it takes a while
+            if driver is None:
+                try:
+                    return self._start_driver()
+                except Exception:
+                    with self._condition:
+                        self._num_alive -= 1
+                        self._condition.notify()
+                    raise
+            if self._is_healthy(driver):
+                return driver
+            logging.warning('Driver pool dropped an unhealthy driver')
+            self._quit_driver(driver)
+
+    def release(self, driver, broken=False):
+        """
+        This method returns a leased driver to the pool.  The driver is quit
+            instead if it has reached max_uses, is broken, or the pool is closed.
+        """
+        with self._condition:
+            uses = self._uses.get(id(driver), 0) + 1
+            self._uses[id(driver)] = uses
+            retire = broken or self._closed or uses >= self.max_uses
+            if not retire:
+                self._idle.append(driver)
+                self._condition.notify()
+        if retire:
+            self._quit_driver(driver)
+
+    @contextmanager
+    def lease(self):
+        """
+        This method leases a driver for the duration of a with block.
+            A driver that raised a WebDriverException is recycled.
+        """
+        driver = self.acquire()
+        try:
+            yield driver
+        except WebDriverException:
+            self.release(driver, broken=True)
+            raise
+        except BaseException:
+            self.release(driver)
+            raise
+        else:
+            self.release(driver)
+
+    def close(self):
+        """
+        This method quits all idle drivers and refuses any further leases.
+            The cookies captured from the drivers are saved.
+        """
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._condition.notify_all()
+        for driver in idle:
+            self._quit_driver(driver)
+        if self.cookie_store is not None:
+            self.cookie_store.save()
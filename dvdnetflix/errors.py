@@ -0,0 +1,29 @@
+"""This module contains the exceptions raised while scraping DVD Netflix."""
+
+
+class NetflixError(Exception):
+    """This is the base class of the exceptions raised by the scraper."""
+
+
+class FetchError(NetflixError):
+    """This exception is raised when a page couldn't be retrieved."""
+
+
+class FetchTimeout(FetchError):
+    """This exception is raised when a page or its marker element didn't load in time."""
+
+
+class ThrottledError(FetchError):
+    """This exception is raised when the site answers with a rate limit or error page."""
+
+
+class SearchResultsError(FetchError):
+    """This exception is raised when the search results didn't load."""
+
+
+class NoMatchError(NetflixError):
+    """This exception is raised when no search result matches the title."""
+
+
+class NotSignedInError(NetflixError):
+    """This exception is raised when ratings are needed, but no cookies were loaded."""
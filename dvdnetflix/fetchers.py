@@ -0,0 +1,300 @@
+"""
+This module contains the fetchers used by NetflixSession to retrieve the
+    html of search and movie pages.
+
+A fetcher has a fetch(url, marker=None) method that returns the page html,
+    where marker is the id of an element the page must contain, and a
+    session() context manager that groups several fetches together.
+
+Selenium and requests are imported by the fetchers that use them, the first
+    time they are needed, so that importing this module is cheap.
+"""
+
+from contextlib import contextmanager, ExitStack
+from collections import namedtuple
+from .errors import FetchError, FetchTimeout, ThrottledError
+from . import instrumentation
+import threading
+import logging
+import time
+import re
+
+# javascript returning the bytes transferred and requests made for the page
+TRANSFER_SCRIPT = '''
+var entries = performance.getEntriesByType('navigation')
+    .concat(performance.getEntriesByType('resource'));
+var bytes = 0;
+for (var i = 0; i < entries.length; i++) { bytes += entries[i].transferSize || 0; }
+return [bytes, entries.length];
+'''
+
+LoadReport = namedtuple('LoadReport', ['url', 'lean', 'seconds', 'bytes', 'requests'])
+
+
+def has_marker(html, marker):
+    """This function checks if the html contains an element with id marker."""
+    return re.search('id=["\']' + re.escape(marker) + '["\']', html) is not None
+
+
+class Fetcher:
+    """This is the base class for fetchers."""
+
+    def fetch(self, url, marker=None):
+        """
+        This method returns the html of the page at url.
+
+        url: string of the page to retrieve
+        marker: if given, id of an element that must be present in the page
+        """
+        raise NotImplementedError
+
+    @contextmanager
+    def session(self):
+        """
+        This method groups several fetches, so backends can reuse resources
+            between them.  By default it does nothing.
+        """
+        yield self
+
+    def close(self):
+        """This method releases any resources held by the fetcher."""
+
+
+class LoadStats:
+    """
+    This is a class collecting a LoadReport for every page loaded in a
+        browser, and comparing the loads of lean browsers with normal ones.
+    """
+
+    def __init__(self, keep=100):
+        """keep: number of recent reports kept in reports"""
+        self.keep = keep
+        self.reports = []
+        self.totals = {True: [0, 0., 0], False: [0, 0., 0]}
+        self._lock = threading.Lock()
+
+    def add(self, report):
+        """This method records the report of one load."""
+        with self._lock:
+            self.reports = (self.reports + [report])[-self.keep:]
+            totals = self.totals[report.lean]
+            totals[0] += 1
+            totals[1] += report.seconds
+            totals[2] += report.bytes
+        logging.info('Loaded %s in %.2f s, %d bytes in %d requests'
+                     % (report.url, report.seconds, report.bytes, report.requests))
+        instrumentation.count('bytes_transferred', report.bytes)
+
+    def summary(self):
+        """
+        This method returns the average seconds and bytes per load in lean and
+            normal browsers, and the savings of the lean loads once both kinds
+            of loads have been seen.
+        """
+        with self._lock:
+            summary = {}
+            for lean, (loads, seconds, num_bytes) in self.totals.items():
+                if loads:
+                    summary['lean' if lean else 'normal'] = {
+                        'loads': loads, 'seconds_per_load': seconds / loads,
+                        'bytes_per_load': num_bytes / loads}
+        if 'lean' in summary and 'normal' in summary:
+            summary['saved_per_load'] = {
+                key: summary['normal'][key] - summary['lean'][key]
+                for key in ('seconds_per_load', 'bytes_per_load')}
+        return summary
+
+
+class SeleniumFetcher(Fetcher):
+    """This is a fetcher that loads pages in Chrome, so JavaScript is run."""
+
+    def __init__(self, cookies=None, driver_pool=None, delay=3,
+                 cookie_store=None, lean=False, load_stats=None):
+        """
+        cookies: list of cookie dicts installed on new drivers
+        driver_pool: a DriverPool to lease drivers from, otherwise a new
+                        browser is started for every session() or fetch
+        delay: seconds to wait for the marker element to appear
+        cookie_store: a CookieStore refreshed with the cookies of the
+                        browsers started by this fetcher
+        lean: if True, browsers started by this fetcher skip images, fonts,
+                media and third party hosts (a pool's own setting is used
+                for leased browsers)
+        load_stats: a LoadStats receiving a report of every lean load, and of
+                        every other load while instrumentation is enabled
+        """
+        self.cookies = cookies
+        self.driver_pool = driver_pool
+        self.cookie_store = cookie_store
+        self.delay = delay
+        self.lean = driver_pool.lean if driver_pool else lean
+        self.load_stats = load_stats
+        self._local = threading.local()
+
+    @contextmanager
+    def _driver(self):
+        """
+        This method provides a webdriver with the cookies installed, leased
+            from the driver pool if there is one, or otherwise started for
+            this use only.
+        """
+        if self.driver_pool:
+            with self.driver_pool.lease() as driver:
+                yield driver
+            return
+        from .driver_pool import start_driver, capture_cookies
+        # create a driver using chromedriver, with the cookies installed
+        cookies = self.cookies
+        if self.cookie_store is not None:
+            cookies = self.cookie_store.cookies
+        driver = start_driver(cookies=cookies, lean=self.lean)
+        try:
+            yield driver
+        finally:
+            if self.cookie_store is not None:
+                capture_cookies(driver, self.cookie_store)
+            driver.quit()
+
+    @contextmanager
+    def session(self):
+        """
+        This method keeps one driver for all fetches in the with block.  The
+            driver is only started by the first fetch that needs it.
+        """
+        if getattr(self._local, 'stack', None) is not None:
+            yield self
+            return
+        self._local.stack = ExitStack()
+        self._local.driver = None
+        try:
+            with self._local.stack:
+                yield self
+        finally:
+            self._local.stack = self._local.driver = None
+
+    def fetch(self, url, marker=None):
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.common.by import By
+        with self.session():
+            if self._local.driver is None:
+                self._local.driver = self._local.stack.enter_context(
+                    self._driver())
+            driver = self._local.driver
+            start = time.perf_counter()
+            with instrumentation.span('page_load', backend='selenium'):
+                driver.get(url)
+            if marker:
+                # poll often, so the page is read as soon as the element exists
+                try:
+                    with instrumentation.span('page_wait'):
+                        WebDriverWait(driver, self.delay, poll_frequency=.1).until(
+                            EC.presence_of_element_located((By.ID, marker)))
+                except TimeoutException:
+                    raise FetchTimeout(marker + ' did not load: ' + url)
+            html = driver.page_source
+            # measuring the transfer costs a script round trip, so normal
+            # loads are only measured while instrumentation is on
+            if self.load_stats is not None and (self.lean or
+                                                instrumentation.metrics.enabled):
+                seconds = time.perf_counter() - start
+                num_bytes, requests_made = driver.execute_script(TRANSFER_SCRIPT)
+                self.load_stats.add(LoadReport(url, self.lean, seconds,
+                                               num_bytes, requests_made))
+            return html
+
+
+class HttpFetcher(Fetcher):
+    """
+    This is a fetcher that retrieves pages with a pooled keep-alive HTTP
+        client.  It's much faster than a browser, but doesn't run JavaScript.
+    """
+
+    user_agent = ('Mozilla/5.0 (Macintosh; Intel Mac OS X 10_12_5) '
+                  'AppleWebKit/537.36 (KHTML, like Gecko) '
+                  'Chrome/59.0.3071.115 Safari/537.36')
+
+    def __init__(self, cookies=None, timeout=10, pool_size=10,
+                 cookie_store=None):
+        """
+        cookies: list of cookie dicts sent with every request
+        timeout: seconds to wait for a response
+        pool_size: number of connections kept alive per host
+        cookie_store: a CookieStore refreshed with the cookies the site sent,
+                        when the fetcher is closed
+        """
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.timeout = timeout
+        self.cookie_store = cookie_store
+        self.client = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size)
+        self.client.mount('http://', adapter)
+        self.client.mount('https://', adapter)
+        self.client.headers['User-Agent'] = self.user_agent
+        for cookie in cookies or []:
+            self.client.cookies.set(cookie['name'], cookie['value'],
+                                    domain=cookie.get('domain', ''),
+                                    path=cookie.get('path', '/'))
+
+    def fetch(self, url, marker=None):
+        import requests
+        try:
+            with instrumentation.span('page_load', backend='http'):
+                response = self.client.get(url, timeout=self.timeout)
+        except requests.Timeout as error:
+            raise FetchTimeout(str(error))
+        except requests.RequestException as error:
+            raise FetchError(str(error))
+        if response.status_code in (429, 503):
+            raise ThrottledError(str(response.status_code) + ' for ' + url)
+        try:
+            response.raise_for_status()
+        except requests.RequestException as error:
+            raise FetchError(str(error))
+        html = response.text
+        if marker and not has_marker(html, marker):
+            raise FetchError(marker + ' not found in response: ' + url)
+        return html
+
+    def close(self):
+        if self.cookie_store is not None:
+            self.cookie_store.capture_jar(self.client.cookies)
+        self.client.close()
+
+
+class FallbackFetcher(Fetcher):
+    """
+    This is a fetcher that tries a fast fetcher first, and falls back to a
+        slower one when the fast one fails or the expected marker is missing,
+        e.g. the http backend with the selenium backend as fallback.
+
+    Timeouts and throttled responses are raised instead of falling back,
+        since the site is asking us to slow down, and a RateGovernor around
+        this fetcher has to see them to back off.
+    """
+
+    def __init__(self, primary, fallback):
+        self.primary = primary
+        self.fallback = fallback
+
+    @contextmanager
+    def session(self):
+        # the fallback is only used now and then, so don't hold it open
+        with self.primary.session():
+            yield self
+
+    def fetch(self, url, marker=None):
+        try:
+            return self.primary.fetch(url, marker)
+        except (FetchTimeout, ThrottledError):
+            raise
+        except FetchError as error:
+            logging.info('Falling back for ' + url + ': ' + str(error))
+        return self.fallback.fetch(url, marker)
+
+    def close(self):
+        self.primary.close()
+        self.fallback.close()
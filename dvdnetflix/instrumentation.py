@@ -0,0 +1,193 @@
+"""
+This module contains the timers, counters and spans used to see where the
+    time goes in a load or a batch (driver startup, cookie injection, page
+    waits, parsing, matching, .nfo writes, ...).
+
+Instrumentation is off by default, and then span() returns a shared object
+    that does nothing, so the calls left in the code cost next to nothing.
+
+    >>> import instrumentation
+    >>> instrumentation.enable(jsonl_path='spans.jsonl')
+    >>> ...
+    >>> instrumentation.write_prometheus('dvdnetflix.prom')
+"""
+
+import threading
+import logging
+import json
+import time
+import os
+
+
+class _NullSpan:
+    """This is the span used when instrumentation is disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """This is a class timing one phase, nested in the phase that opened it."""
+
+    __slots__ = ('metrics', 'name', 'labels', 'parent', 'start')
+
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        stack = self.metrics._stack()
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        duration = time.perf_counter() - self.start
+        self.metrics._stack().pop()
+        self.metrics._record(self, duration, exc_type)
+        return False
+
+
+class Metrics:
+    """
+    This is a class collecting timers (count, total, min and max seconds per
+        phase) and counters, and optionally streaming every span to a JSON
+        lines file.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.timers = {}
+        self.counters = {}
+        self._jsonl = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def enable(self, jsonl_path=None):
+        """
+        This method turns instrumentation on.
+
+        jsonl_path: if given, every finished span is appended to this file
+        """
+        with self._lock:
+            if self._jsonl:
+                self._jsonl.close()
+            self._jsonl = open(jsonl_path, 'a') if jsonl_path else None
+            self.enabled = True
+
+    def disable(self):
+        """This method turns instrumentation off, and closes the JSON lines file."""
+        with self._lock:
+            self.enabled = False
+            if self._jsonl:
+                self._jsonl.close()
+                self._jsonl = None
+
+    def reset(self):
+        """This method clears all timers and counters."""
+        with self._lock:
+            self.timers = {}
+            self.counters = {}
+
+    def span(self, name, **labels):
+        """This method returns a context manager timing the phase called name."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, labels)
+
+    def count(self, name, value=1):
+        """This method adds value to the counter called name."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def _record(self, span, duration, exc_type):
+        with self._lock:
+            timer = self.timers.get(span.name)
+            if timer is None:
+                timer = self.timers[span.name] = {'count': 0, 'seconds': 0.,
+                                                  'min': duration, 'max': duration,
+                                                  'errors': 0}
+            timer['count'] += 1
+            timer['seconds'] += duration
+            timer['min'] = min(timer['min'], duration)
+            timer['max'] = max(timer['max'], duration)
+            if exc_type is not None:
+                timer['errors'] += 1
+            if self._jsonl:
+                event = {'span': span.name, 'parent': span.parent,
+                         'seconds': round(duration, 6), 'time': time.time(),
+                         'thread': threading.get_ident(),
+                         'error': exc_type.__name__ if exc_type else None}
+                event.update(span.labels)
+                self._jsonl.write(json.dumps(event) + '\n')
+                self._jsonl.flush()
+
+    def snapshot(self):
+        """This method returns a copy of the timers and counters."""
+        with self._lock:
+            return {'timers': {name: dict(timer) for name, timer in self.timers.items()},
+                    'counters': dict(self.counters)}
+
+    def prometheus_text(self, prefix='dvdnetflix'):
+        """This method returns the timers and counters in Prometheus text format."""
+        snapshot = self.snapshot()
+        lines = ['# TYPE ' + prefix + '_phase_seconds summary']
+        for name, timer in sorted(snapshot['timers'].items()):
+            label = '{phase="' + name + '"}'
+            lines.append(prefix + '_phase_seconds_sum' + label + ' ' + repr(timer['seconds']))
+            lines.append(prefix + '_phase_seconds_count' + label + ' ' + str(timer['count']))
+        lines.append('# TYPE ' + prefix + '_phase_errors_total counter')
+        for name, timer in sorted(snapshot['timers'].items()):
+            lines.append(prefix + '_phase_errors_total{phase="' + name + '"} '
+                         + str(timer['errors']))
+        lines.append('# TYPE ' + prefix + '_events_total counter')
+        for name, value in sorted(snapshot['counters'].items()):
+            lines.append(prefix + '_events_total{event="' + name + '"} ' + str(value))
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """
+        This method writes the Prometheus text to path, e.g. for the node
+            exporter's textfile collector.  The file is replaced atomically.
+        """
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as f:
+            f.write(self.prometheus_text())
+        os.replace(temp_path, path)
+
+
+# the metrics shared by the whole process
+metrics = Metrics()
+enable = metrics.enable
+disable = metrics.disable
+span = metrics.span
+count = metrics.count
+snapshot = metrics.snapshot
+write_prometheus = metrics.write_prometheus
+
+
+def configure_logging(filename='session.log', level=logging.INFO):
+    """
+    This function sends log messages to a file, overwriting it.  Scripts call
+        it themselves, so importing the scraper doesn't touch logging.
+    """
+    logging.basicConfig(filename=filename, filemode='w', level=level)
+    logging.info('Opening log file')
@@ -0,0 +1,214 @@
+"""
+This module contains the JobJournal class, which records the state of every
+    title of a library run in SQLite, so a run that crashed or was stopped
+    continues where it stopped, and failed titles can be retried on their own.
+
+Workers lease titles from the journal for a while.  Several threads or
+    processes on one machine can work on the same journal without doing a
+    title twice, and the titles of a worker that died are leased again once
+    its leases expire.  A title goes through these states:
+
+    queued -> fetched -> parsed -> written
+                                -> review  (no confident match)
+                                -> failed  (with the error)
+
+The journal holds one run at a time.  Enqueuing a library while titles are
+    unfinished resumes that run, and enqueuing it once all are finished
+    starts the next run.
+"""
+
+from collections import namedtuple
+from .titles import Title
+import threading
+import sqlite3
+import socket
+import json
+import time
+import os
+
+# states a title doesn't leave, unless failed titles are retried
+FINAL_STATES = ('written', 'review', 'failed')
+
+# a leased title, with the fields to update (None means all)
+Lease = namedtuple('Lease', ['title', 'fields', 'attempts'])
+
+
+class LeaseLost(Exception):
+    """Raised when a worker's lease on a title expired and was taken over."""
+
+
+def default_owner():
+    """This function returns a name for this process that is unique across machines."""
+    return socket.gethostname() + ':' + str(os.getpid())
+
+
+class JobJournal:
+    """This is a class that stores the state and lease of each title in SQLite."""
+
+    def __init__(self, path='./journal.sqlite', lease_seconds=600, shared=False):
+        """
+        path: string of path to the SQLite database file
+        lease_seconds: seconds a worker has to finish a title before another
+                        worker may take it over
+        shared: True to use SQLite's rollback journal instead of WAL mode,
+                        which needs shared memory and so a local disk.  This
+                        lets the journal be opened on a network filesystem,
+                        but SQLite's locks aren't reliable there (e.g. NFS),
+                        so only one machine should work on it at a time
+        """
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=60, check_same_thread=False,
+                                   isolation_level=None)
+        self._db.execute('PRAGMA journal_mode = ' + ('DELETE' if shared else 'WAL'))
+        self._db.executescript('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                nfo_path TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                name TEXT NOT NULL,
+                fields TEXT,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                owner TEXT,
+                lease_expires REAL,
+                updated_at REAL NOT NULL);
+            CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, lease_expires);
+        ''')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _transaction(self, function, *args):
+        """
+        This method runs function in a transaction that holds the database's
+            write lock from the start, so concurrent leases can't overlap.
+        """
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                result = function(*args)
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+            self._db.execute('COMMIT')
+            return result
+
+    def enqueue(self, work, now=None):
+        """
+        This method queues the titles of a run, and returns how many were
+            queued.  While the journal has unfinished titles, the run is
+            resumed: only titles that aren't in the journal yet are added,
+            and the others keep their state.  Once every title is finished,
+            the next call starts a new run: the finished run's titles are
+            cleared and all of work is queued again, so a weekly run doesn't
+            find everything already written.
+
+        work: list of Titles, or of (title, reason, fields) WorkItems, see
+                library_manifest.LibraryManifest.scan
+        """
+        now = now or time.time()
+        rows = []
+        for item in work:
+            title, fields = (item, None) if hasattr(item, 'nfo_path') else (item[0], item[2])
+            rows.append((title.nfo_path, title.kind, title.name,
+                         None if fields is None else json.dumps(sorted(fields)),
+                         now))
+
+        def insert():
+            unfinished = self._db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE state NOT IN ('written', 'review', 'failed')"
+                ).fetchone()[0]
+            if not unfinished:
+                self._db.execute('DELETE FROM jobs')
+            before = self._db.total_changes
+            self._db.executemany(
+                "INSERT OR IGNORE INTO jobs (nfo_path, kind, name, fields, state, "
+                "updated_at) VALUES (?, ?, ?, ?, 'queued', ?)", rows)
+            return self._db.total_changes - before
+        return self._transaction(insert)
+
+    def lease(self, owner, count=1, now=None):
+        """
+        This method leases up to count titles to owner, and returns a list of
+            Leases.  Queued titles come first, then titles whose worker's lease
+            expired before they were finished.
+        """
+        now = now or time.time()
+
+        def take():
+            rows = self._db.execute(
+                "SELECT nfo_path, kind, name, fields, attempts FROM jobs "
+                "WHERE state = 'queued' AND (lease_expires IS NULL OR lease_expires < ?) "
+                "   OR state IN ('fetched', 'parsed') AND lease_expires < ? "
+                "ORDER BY state != 'queued', rowid LIMIT ?",
+                (now, now, count)).fetchall()
+            self._db.executemany(
+                "UPDATE jobs SET state = 'queued', owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE nfo_path = ?",
+                [(owner, now + self.lease_seconds, now, row[0]) for row in rows])
+            return rows
+        return [Lease(Title(kind, name, nfo_path),
+                      None if fields is None else json.loads(fields), attempts + 1)
+                for nfo_path, kind, name, fields, attempts in self._transaction(take)]
+
+    def mark(self, title, state, owner, error=None, now=None):
+        """
+        This method moves a leased title to state, and renews the lease.
+            LeaseLost is raised if another worker took the title over, so the
+            title is never written twice.
+        """
+        now = now or time.time()
+        expires = None if state in FINAL_STATES else now + self.lease_seconds
+
+        def update():
+            cursor = self._db.execute(
+                "UPDATE jobs SET state = ?, error = ?, lease_expires = ?, "
+                "updated_at = ? WHERE nfo_path = ? AND owner = ? "
+                "AND state NOT IN ('written', 'review', 'failed')",
+                (state, error, expires, now, title.nfo_path, owner))
+            if cursor.rowcount != 1:
+                raise LeaseLost(title.nfo_path + ' is no longer leased by ' + owner)
+        self._transaction(update)
+
+    def retry_failed(self, max_attempts=3, now=None):
+        """
+        This method queues the failed titles again, unless they already failed
+            max_attempts times, and returns how many were queued.
+        """
+        now = now or time.time()
+
+        def requeue():
+            return self._db.execute(
+                "UPDATE jobs SET state = 'queued', owner = NULL, lease_expires = NULL, "
+                "updated_at = ? WHERE state = 'failed' AND attempts < ?",
+                (now, max_attempts)).rowcount
+        return self._transaction(requeue)
+
+    def counts(self):
+        """This method returns a dictionary of the number of titles in each state."""
+        with self._lock:
+            return dict(self._db.execute(
+                'SELECT state, COUNT(*) FROM jobs GROUP BY state').fetchall())
+
+    def failures(self):
+        """This method returns a list of (nfo_path, attempts, error) of failed titles."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT nfo_path, attempts, error FROM jobs WHERE state = 'failed' "
+                "ORDER BY nfo_path").fetchall()
+
+    def pending(self):
+        """This method returns the number of titles that aren't finished."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE state NOT IN ('written', 'review', 'failed')"
+                ).fetchone()[0]
+
+    def close(self):
+        """This method closes the database."""
+        with self._lock:
+            self._db.close()
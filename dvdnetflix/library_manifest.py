@@ -0,0 +1,152 @@
+"""
+This module contains the LibraryManifest class, which remembers the state of
+    every .nfo file between runs, so only new or stale titles are scraped again.
+"""
+
+from collections import namedtuple
+import threading
+import hashlib
+import sqlite3
+import time
+import os
+
+DAY = 24 * 3600
+
+# seconds before each data selection is scraped again (None means never)
+REFRESH_INTERVALS = {'avg-rating': 7 * DAY,
+                     'best-guess-rating': 7 * DAY,
+                     'genre-moods': 90 * DAY,
+                     'plot': 180 * DAY,
+                     'outline': 180 * DAY,
+                     'landscape': 180 * DAY,
+                     'netflix-tag': None}
+
+# a title that needs work, with the reason and the fields to scrape
+WorkItem = namedtuple('WorkItem', ['title', 'reason', 'fields'])
+
+
+def file_hash(path):
+    """This function returns the sha1 hex digest of a file's contents."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class LibraryManifest:
+    """
+    This is a class that stores the size, mtime and hash of each .nfo file, its
+        dvd-netflix-url, and when each field was last scraped, in SQLite.
+        A scan only stats files, and hashes the few whose stat changed.
+    """
+
+    def __init__(self, path='./manifest.sqlite', refresh_intervals=REFRESH_INTERVALS):
+        """
+        path: string of path to the SQLite database file
+        refresh_intervals: dictionary of seconds before a field is stale
+        """
+        self.refresh_intervals = refresh_intervals
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript('''
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                sha1 TEXT NOT NULL,
+                url TEXT);
+            CREATE TABLE IF NOT EXISTS fields (
+                path TEXT NOT NULL,
+                field TEXT NOT NULL,
+                scraped_at REAL NOT NULL,
+                PRIMARY KEY (path, field));
+        ''')
+
+    def scan(self, titles, fields, now=None):
+        """
+        This method compares the titles with the manifest, and returns the
+            minimal list of WorkItems: new files, files edited since the last
+            run, and files with fields whose refresh interval has passed.
+            Files that no longer exist are forgotten.
+
+        titles: list of Titles, see batch_update.find_titles
+        fields: list of data selections the run will update
+        """
+        now = now or time.time()
+        with self._lock:
+            known = {row[0]: row[1:] for row in self._db.execute(
+                'SELECT path, mtime_ns, size, sha1 FROM files')}
+            scraped = {}
+            for path, field, scraped_at in self._db.execute(
+                    'SELECT path, field, scraped_at FROM fields'):
+                scraped.setdefault(path, {})[field] = scraped_at
+
+        work = []
+        seen = set()
+        touched = []
+        for title in titles:
+            path = title.nfo_path
+            seen.add(path)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if path not in known:
+                work.append(WorkItem(title, 'new', set(fields)))
+                continue
+            mtime_ns, size, sha1 = known[path]
+            if (stat.st_mtime_ns, stat.st_size) != (mtime_ns, size):
+                if file_hash(path) != sha1:
+                    work.append(WorkItem(title, 'edited', set(fields)))
+                    continue
+                # only the mtime changed, so remember the new one
+                touched.append((stat.st_mtime_ns, stat.st_size, path))
+            stale = {field for field in fields
+                     if self._is_stale(scraped.get(path, {}), field, now)}
+            if stale:
+                work.append(WorkItem(title, 'stale', stale))
+
+        with self._lock, self._db:
+            self._db.executemany('UPDATE files SET mtime_ns = ?, size = ? '
+                                 'WHERE path = ?', touched)
+            gone = [(path,) for path in known if path not in seen]
+            self._db.executemany('DELETE FROM files WHERE path = ?', gone)
+            self._db.executemany('DELETE FROM fields WHERE path = ?', gone)
+        return work
+
+    def _is_stale(self, scraped, field, now):
+        if field not in scraped:
+            return True
+        interval = self.refresh_intervals.get(field)
+        return interval is not None and now - scraped[field] >= interval
+
+    def mark_scraped(self, title, fields, url=None, now=None):
+        """
+        This method records that fields of a title were scraped, along with the
+            file's current state, so the run's own write isn't seen as an edit.
+        """
+        now = now or time.time()
+        path = title.nfo_path
+        stat = os.stat(path)
+        sha1 = file_hash(path)
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT INTO files (path, mtime_ns, size, sha1, url) '
+                'VALUES (?, ?, ?, ?, ?) ON CONFLICT(path) DO UPDATE SET '
+                'mtime_ns = excluded.mtime_ns, size = excluded.size, '
+                'sha1 = excluded.sha1, url = COALESCE(excluded.url, files.url)',
+                (path, stat.st_mtime_ns, stat.st_size, sha1, url))
+            self._db.executemany(
+                'INSERT OR REPLACE INTO fields (path, field, scraped_at) '
+                'VALUES (?, ?, ?)', [(path, field, now) for field in fields])
+
+    def url(self, title):
+        """This method returns the dvd-netflix-url recorded for a title, or None."""
+        with self._lock:
+            row = self._db.execute('SELECT url FROM files WHERE path = ?',
+                                   (title.nfo_path,)).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,149 @@
+"""
+This module contains functions that score search names against candidate
+    titles in batches.
+
+Candidates are (name, year, url) tuples, as returned by search pages.  When
+    rapidfuzz and numpy are installed, the whole score matrix is computed
+    in C, otherwise each pair is scored with fuzzywuzzy.
+"""
+
+from collections import namedtuple
+from importlib.util import find_spec
+import re
+
+# the scoring libraries are only imported when something is scored
+ACCELERATED = find_spec('rapidfuzz') is not None and find_spec('numpy') is not None
+
+# points taken off the text score for each year between query and candidate
+YEAR_PENALTY = 5
+
+LEADING_ARTICLE = re.compile(r'^(the|a|an) ')
+PUNCTUATION = re.compile(r'[^\w\s]')
+
+
+class Match(namedtuple('Match', ['score', 'text_score', 'candidate', 'index'])):
+    """
+    This is a ranked candidate.  score is the text score minus the year
+        penalty, and index is the position of the candidate in the input.
+    """
+
+    __slots__ = ()
+
+
+def normalize_title(title):
+    """
+    This function lowercases a title, spells out '&', and removes leading
+        articles and punctuation, so that e.g. 'The Good, the Bad & the Ugly'
+        and 'good the bad and the ugly' are identical.
+    """
+    title = title.lower().replace('&', ' and ')
+    title = ' '.join(PUNCTUATION.sub(' ', title).split())
+    return LEADING_ARTICLE.sub('', title)
+
+
+def score_matrix(queries, names):
+    """
+    This function returns the text scores (0-100) of every query against every
+        name, as a numpy array when accelerated, otherwise as a list of lists.
+
+    queries: list of search names
+    names: list of candidate names
+    """
+    queries = [normalize_title(query) for query in queries]
+    names = [normalize_title(name) for name in names]
+    if ACCELERATED:
+        from rapidfuzz import fuzz as rapid_fuzz, process as rapid_process
+        import numpy as np
+        return rapid_process.cdist(queries, names, scorer=rapid_fuzz.ratio,
+                                   dtype=np.float32, workers=-1)
+    from fuzzywuzzy import fuzz
+    return [[fuzz.ratio(query, name) for name in names] for query in queries]
+
+
+def _year_distance(query_year, candidate_year):
+    if query_year is None or candidate_year is None:
+        return 0
+    return abs(query_year - candidate_year)
+
+
+def rank_many(queries, candidates, min_score=0, max_year_diff=None,
+              year_penalty=YEAR_PENALTY, limit=None):
+    """
+    This function ranks the candidates for many queries in one batched call,
+        and returns a list with a ranked list of Matches for each query.
+
+    queries: list of (name, year) tuples, where year can be None
+    candidates: list of (name, year, url) tuples
+    min_score: text score a candidate needs to be included
+    max_year_diff: if given, candidates further from the query year are left out
+    year_penalty: points taken off the score for each year of difference
+    limit: maximum number of matches returned per query
+    """
+    if not queries:
+        return []
+    if not candidates:
+        return [[] for _ in queries]
+    text_scores = score_matrix([query[0] for query in queries],
+                               [candidate[0] for candidate in candidates])
+    if ACCELERATED:
+        return _rank_arrays(queries, candidates, text_scores, min_score,
+                            max_year_diff, year_penalty, limit)
+
+    rankings = []
+    for (_, query_year), row in zip(queries, text_scores):
+        matches = []
+        for index, (text_score, candidate) in enumerate(zip(row, candidates)):
+            distance = _year_distance(query_year, candidate[1])
+            if text_score < min_score:
+                continue
+            if max_year_diff is not None and distance > max_year_diff:
+                continue
+            matches.append(Match(text_score - year_penalty * distance,
+                                 text_score, candidate, index))
+        # sorting is stable, so ties keep the order of the search results
+        matches.sort(key=lambda match: -match.score)
+        rankings.append(matches[:limit])
+    return rankings
+
+
+def _rank_arrays(queries, candidates, text_scores, min_score, max_year_diff,
+                 year_penalty, limit):
+    """This function is the numpy version of the ranking in rank_many."""
+    import numpy as np
+    query_years = np.array([np.nan if year is None else year
+                            for _, year in queries], dtype=np.float32)
+    candidate_years = np.array([np.nan if candidate[1] is None else candidate[1]
+                                for candidate in candidates], dtype=np.float32)
+    # unknown years count as a distance of 0
+    distance = np.nan_to_num(np.abs(query_years[:, None] - candidate_years[None, :]))
+    scores = text_scores - year_penalty * distance
+    keep = text_scores >= min_score
+    if max_year_diff is not None:
+        keep &= distance <= max_year_diff
+    scores = np.where(keep, scores, -np.inf)
+    order = np.argsort(-scores, axis=1, kind='stable')
+    rankings = []
+    for row, indices in enumerate(order):
+        matches = []
+        for index in indices[:limit]:
+            if not keep[row, index]:
+                break
+            matches.append(Match(float(scores[row, index]),
+                                 float(text_scores[row, index]),
+                                 candidates[index], int(index)))
+        rankings.append(matches)
+    return rankings
+
+
+def rank(query, candidates, year=None, **kwargs):
+    """
+    This function ranks the candidates for a single search name, and returns
+        a list of Matches, best first.  See rank_many for the options.
+    """
+    return rank_many([(query, year)], candidates, **kwargs)[0]
+
+
+def best_match(query, candidates, year=None, **kwargs):
+    """This function returns the best Match for a search name, or None."""
+    matches = rank(query, candidates, year, limit=1, **kwargs)
+    return matches[0] if matches else None
@@ -0,0 +1,181 @@
+"""This module contains the MovieRecord class and the page parsing functions."""
+
+from collections import namedtuple
+from importlib.util import find_spec
+from functools import lru_cache
+import re
+
+# lxml is much faster than the builtin parser, so use it when installed
+PARSER = 'lxml' if find_spec('lxml') else 'html.parser'
+
+# the elements of a movie page read by extract_movie_record, by tag and class
+MOVIE_CLASSES = {'h1': 'title', 'span': 'year', 'p': 'synopsis', 'img': 'boxShotImg'}
+MOVIE_IDS = ('mdp-details', 'ratingInfo')
+
+
+def parse_html(html, parse_only=None):
+    """
+    This function parses html with the fastest available parser.
+
+    parse_only: if given, a SoupStrainer or a tag_filter, and only the tags
+                it accepts are built, with their contents
+    """
+    # imported here, so runs that never parse a page don't pay for bs4
+    from bs4 import BeautifulSoup
+    if parse_only is None:
+        return BeautifulSoup(html, PARSER)
+    return BeautifulSoup(html, PARSER, parse_only=parse_only)
+
+
+@lru_cache(maxsize=None)
+def tag_filter(accept):
+    """
+    This function returns a parse_only filter of the tags accepted by a
+        function of a tag's name and attributes, on every version of bs4.
+    """
+    from bs4 import SoupStrainer, __version__
+    if tuple(map(int, __version__.split('.')[:2])) < (4, 13):
+        return SoupStrainer(accept)
+
+    # bs4 4.13 and later only pass the name to a SoupStrainer's function,
+    # so ask the function from the filter deciding which tags are built
+    from bs4.filter import ElementFilter
+
+    class TagFilter(ElementFilter):
+        def allow_tag_creation(self, nsprefix, name, attrs):
+            return accept(name, attrs or {})
+
+        def allow_string_creation(self, string):
+            # only the strings inside the accepted tags are kept
+            return False
+
+    return TagFilter()
+
+
+def _classes(attrs):
+    """This function returns the list of classes in the attributes of a tag."""
+    classes = attrs.get('class') or ()
+    return classes.split() if isinstance(classes, str) else classes
+
+
+def is_movie_fragment(name, attrs):
+    """This function accepts the elements of a movie page extract_movie_record reads."""
+    if attrs.get('id') in MOVIE_IDS:
+        return True
+    return name in MOVIE_CLASSES and MOVIE_CLASSES[name] in _classes(attrs)
+
+
+def is_search_results(name, attrs):
+    """This function accepts the search results of a search page, and its page links."""
+    return attrs.get('id') == 'SliderContainer' or 'pagination' in _classes(attrs)
+
+
+def parse_movie_fragments(html):
+    """
+    This function parses only the elements of a movie page that are scraped,
+        which is faster, and a fraction of the memory of the whole page.
+    """
+    return parse_html(html, tag_filter(is_movie_fragment))
+
+
+def parse_search_results(html):
+    """This function parses only the results of a search page."""
+    return parse_html(html, tag_filter(is_search_results))
+
+
+def parse_ratings(html):
+    """
+    This function parses only the ratings of a movie page, and returns the
+        (guess rating, average rating, number of votes), or None if the page
+        has no ratings, e.g. because the session isn't signed in.
+    """
+    from bs4 import SoupStrainer
+    page = parse_html(html, SoupStrainer('div', id='ratingInfo'))
+    rating_info = page.find(id='ratingInfo')
+    if rating_info is None:
+        return None
+    return _read_ratings(rating_info)
+
+
+class MovieRecord(namedtuple('MovieRecord', [
+        'url', 'name', 'year', 'synopsis', 'genres', 'moods',
+        'guess_rating', 'avg_rating', 'num_votes', 'image'])):
+    """
+    This is an immutable record of the data scraped from a movie/show page.
+        genres and moods are tuples, and moods, the ratings and num_votes
+        are None when they aren't on the page.
+    """
+
+    __slots__ = ()
+
+
+def _split_list(tag):
+    """This function splits the comma separated text of a dd tag."""
+    return tuple(i.strip() for i in tag.get_text().split(','))
+
+
+def _has_class(tag, name):
+    return name in (tag.get('class') or ())
+
+
+def _read_ratings(rating_info):
+    """This function returns the (guess, average, votes) of a ratingInfo div."""
+    divs = rating_info.find_all('div')
+    guess_rating = float(divs[0].find('span').get_text().split(' ')[0])
+    avg_rating = float(divs[1].find('span').get_text().split(' ')[0])
+    num_votes = int(divs[1].get_text().split(' ')[2])
+    return guess_rating, avg_rating, num_votes
+
+
+def extract_movie_record(page, url=None, signed_in=True):
+    """
+    This function walks a parsed movie page once, and returns a MovieRecord.
+
+    page: BeautifulSoup of the movie/show page
+    url: string of the url the page was loaded from
+    signed_in: if False, ratings are not read, since they are only shown
+                    to signed in sessions
+    """
+    name = year = synopsis = image = None
+    details = rating_info = None
+
+    # find every element of interest in a single pass over the tree
+    for tag in page.find_all(True):
+        if tag.name == 'h1' and name is None and _has_class(tag, 'title'):
+            name = tag.get_text()
+        elif tag.name == 'span' and year is None and _has_class(tag, 'year'):
+            year = int(tag.get_text())
+        elif tag.name == 'p' and synopsis is None and _has_class(tag, 'synopsis'):
+            synopsis = tag.get_text()
+        elif tag.name == 'img' and image is None and _has_class(tag, 'boxShotImg'):
+            image = 'http:' + tag['src']
+        elif details is None and tag.get('id') == 'mdp-details':
+            details = tag
+        elif rating_info is None and tag.name == 'div' and tag.get('id') == 'ratingInfo':
+            rating_info = tag
+
+    genres = ()
+    moods = None
+    if details is not None:
+        for dt in details.find_all('dt'):
+            if dt.string == 'Genres':
+                genres = _split_list(dt.parent.dd)
+            elif moods is None and dt.string and re.match('^T', dt.string):
+                moods = _split_list(dt.parent.dd)
+
+    guess_rating = avg_rating = num_votes = None
+    if signed_in and rating_info is not None:
+        guess_rating, avg_rating, num_votes = _read_ratings(rating_info)
+
+    return MovieRecord(url=url, name=name, year=year, synopsis=synopsis,
+                       genres=genres, moods=moods, guess_rating=guess_rating,
+                       avg_rating=avg_rating, num_votes=num_votes, image=image)
+
+
+def parse_movie_page(html, url=None, signed_in=True):
+    """
+    This function parses the html of a movie page and returns its MovieRecord.
+        It only takes and returns plain data, so it can run in a process pool.
+    """
+    return extract_movie_record(parse_movie_fragments(html), url, signed_in)
+
@@ -0,0 +1,244 @@
+"""
+This module contains the NfoEditor class, which edits single elements of a
+    Kodi .nfo file without re-serialising the rest of it.
+
+The file is scanned once with an incremental expat parser that records the
+    byte offsets of every element.  Edits replace just those byte ranges, so
+    comments, formatting and unknown tags are kept exactly as they were, and
+    the result is written to a temporary file that replaces the original.
+"""
+
+from xml.parsers import expat
+from xml.sax.saxutils import escape
+import tempfile
+import io
+import os
+
+CHUNK_SIZE = 64 * 1024
+
+
+class Element:
+    """This is a class holding the position and text of one element."""
+
+    __slots__ = ('name', 'depth', 'start', 'content_start', 'content_end',
+                 'end', 'text')
+
+    def __init__(self, name, depth, start):
+        self.name = name
+        self.depth = depth
+        self.start = start
+        self.content_start = self.content_end = self.end = None
+        self.text = []
+
+
+class NfoEditor:
+    """
+    This is a class that reads a .nfo file, and edits the text of elements
+        such as plot, outline, genre, rating, votes and dvd-netflix-url.
+    """
+
+    def __init__(self, path):
+        """
+        Read and scan the .nfo file.
+
+        path: string of path to the .nfo file
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self._load(f)
+
+    def _load(self, f):
+        self._edits = {}
+        self._elements = {}
+        self._root = None
+        self._data = self._scan(f)
+
+    def _scan(self, f):
+        """This method feeds the file to expat in chunks, and returns its bytes."""
+        parser = expat.ParserCreate()
+        parser.buffer_text = True
+        stack = []
+        chunks = []
+
+        def start_element(name, attributes):
+            element = Element(name, len(stack), parser.CurrentByteIndex)
+            stack.append(element)
+            self._elements.setdefault(name, []).append(element)
+            if self._root is None:
+                self._root = element
+
+        def end_element(name):
+            element = stack.pop()
+            element.content_end = parser.CurrentByteIndex
+            element.text = ''.join(element.text)
+
+        def character_data(data):
+            if stack:
+                stack[-1].text.append(data)
+
+        parser.StartElementHandler = start_element
+        parser.EndElementHandler = end_element
+        parser.CharacterDataHandler = character_data
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            chunks.append(chunk)
+            parser.Parse(chunk, not chunk)
+            if not chunk:
+                break
+        data = b''.join(chunks)
+
+        # expat reports where tags start, so find where they end
+        for elements in self._elements.values():
+            for element in elements:
+                start_tag_end = data.index(b'>', element.start) + 1
+                if data[start_tag_end - 2:start_tag_end] == b'/>':
+                    # an empty element like <plot/>
+                    element.content_start = element.content_end = None
+                    element.end = start_tag_end
+                else:
+                    element.content_start = start_tag_end
+                    element.end = data.index(b'>', element.content_end) + 1
+        return data
+
+    def _find(self, name):
+        elements = self._elements.get(name)
+        return elements[0] if elements else None
+
+    def get_text(self, name):
+        """This method returns the text of the first element called name, or None."""
+        element = self._find(name)
+        return element.text if element else None
+
+    def find_all_text(self, name):
+        """This method returns the text of every element called name."""
+        return [element.text for element in self._elements.get(name, [])]
+
+    def _edit(self, start, end, replacement, key=None):
+        # a later edit of the same range replaces the earlier one
+        self._edits[(start, end, key)] = replacement
+
+    @staticmethod
+    def _element_bytes(name, text):
+        return ('<' + name + '>' + escape(text) + '</' + name + '>').encode('utf-8')
+
+    def set_text(self, name, text):
+        """
+        This method replaces the text of the first element called name, and
+            adds the element to the root if there isn't one.  Setting the
+            text it already has isn't counted as an edit.
+        """
+        element = self._find(name)
+        if element is None or element.end is None:
+            # missing, or added by append and not saved yet
+            self._elements.pop(name, None)
+            self.append(name, text)
+            return
+        if element.text == text:
+            return
+        if element.content_start is None:
+            self._edit(element.start, element.end,
+                       self._element_bytes(name, text))
+        else:
+            self._edit(element.content_start, element.content_end,
+                       escape(text).encode('utf-8'))
+        element.text = text
+
+    def remove(self, name, keep_first=False):
+        """
+        This method removes every element called name, along with the
+            indentation and line break around it.
+
+        keep_first: if True, the first element is kept
+        """
+        elements = self._elements.pop(name, [])
+        kept = elements[:1] if keep_first else []
+        for element in elements[len(kept):]:
+            if element.end is None:
+                # added by append and not saved yet, so drop its insertion
+                self._edits = {edit: replacement for edit, replacement
+                               in self._edits.items() if edit[2] != name}
+                continue
+            start, end = element.start, element.end
+            while start > 0 and self._data[start - 1:start] in (b' ', b'\t'):
+                start -= 1
+            if self._data[start - 1:start] == b'\n' and \
+                    self._data[end:end + 1] in (b'\n', b'\r'):
+                end += 2 if self._data[end:end + 2] == b'\r\n' else 1
+            self._edit(start, end, b'')
+        # a name without elements isn't kept, since _find and append expect
+        # every list to have a first element
+        if kept:
+            self._elements[name] = kept
+
+    def append(self, name, text):
+        """
+        This method adds a new element at the end of the root element,
+            indented like the root's other children.
+        """
+        root = self._root
+        children = [elements[0] for elements in self._elements.values()
+                    if elements[0].depth == 1]
+        indent = b''
+        if children:
+            first = min(child.start for child in children)
+            line_start = self._data.rfind(b'\n', 0, first) + 1
+            indent = self._data[line_start:first]
+            if indent.strip():
+                indent = b''
+        position = root.content_end
+        line_start = self._data.rfind(b'\n', 0, position) + 1
+        if not self._data[line_start:position].strip():
+            # the closing root tag is on its own line, insert the line before
+            # it, ending like the line above
+            newline = self._data[line_start - 2:line_start]
+            if newline != b'\r\n':
+                newline = b'\n'
+            self._edit(line_start, line_start,
+                       indent + self._element_bytes(name, text) + newline, name)
+        else:
+            self._edit(position, position, self._element_bytes(name, text), name)
+        element = Element(name, 1, position)
+        element.text = text
+        self._elements.setdefault(name, []).append(element)
+
+    @property
+    def changed(self):
+        """This property is True if any edit has been made."""
+        return bool(self._edits)
+
+    def render(self):
+        """This method returns the bytes of the file with the edits applied."""
+        parts = []
+        position = 0
+        for (start, end, _), replacement in sorted(self._edits.items(),
+                                                   key=lambda edit: edit[0][:2]):
+            parts.append(self._data[position:start])
+            parts.append(replacement)
+            position = max(position, end)
+        parts.append(self._data[position:])
+        return b''.join(parts)
+
+    def save(self, path=None):
+        """
+        This method writes the edited file through a temporary file in the
+            same folder, which then replaces the original, so a crash never
+            leaves a truncated .nfo file.
+        """
+        path = path or self.path
+        data = self.render()
+        folder = os.path.dirname(os.path.abspath(path))
+        fd, temp_path = tempfile.mkstemp(dir=folder, prefix='.nfo-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(path):
+                os.chmod(temp_path, os.stat(path).st_mode & 0o777)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        # start again from the saved file, so further edits build on it
+        self.path = path
+        self._load(io.BytesIO(data))
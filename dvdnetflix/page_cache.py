@@ -0,0 +1,173 @@
+"""This module contains the PageCache class and the CachedFetcher."""
+
+from .fetchers import Fetcher
+from .errors import FetchError
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import threading
+import hashlib
+import logging
+import gzip
+import time
+import os
+
+# query parameters that only track where a link was clicked
+TRACKING_PARAMS = ('strackid', 'trkid')
+
+# fraction of max_bytes the cache is evicted down to, so that every put that
+# goes over the cap doesn't scan the folder again
+LOW_WATER = 0.9
+
+
+def normalize_url(url):
+    """
+    This function returns a canonical version of url, with the tracking
+        query parameters removed and the remaining ones sorted.
+    """
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if k not in TRACKING_PARAMS)
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(),
+                       parts.path, urlencode(query), ''))
+
+
+def page_type(url):
+    """This function returns 'search' for search pages, otherwise 'detail'."""
+    return 'search' if urlsplit(url).path.startswith('/Search') else 'detail'
+
+
+class PageCache:
+    """
+    This is a class that stores fetched pages compressed on disk, keyed by
+        normalised url.  Entries expire after a per page type time to live,
+        and the least recently used entries are evicted above a size cap.
+    """
+
+    def __init__(self, directory='./page_cache',
+                 ttls={'search': 24 * 3600, 'detail': 7 * 24 * 3600},
+                 max_bytes=200 * 1024 ** 2, serve_stale=False):
+        """
+        directory: string of path to the folder holding cached pages
+        ttls: dictionary of seconds each page type stays fresh
+        max_bytes: total compressed size above which old entries are evicted
+        serve_stale: if True, expired entries are served when a fetch fails
+        """
+        self.directory = directory
+        self.ttls = ttls
+        self.max_bytes = max_bytes
+        self.serve_stale = serve_stale
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(entry.stat().st_size for entry in os.scandir(directory)
+                         if entry.name.endswith('.html.gz'))
+
+    def _path(self, url):
+        key = hashlib.sha1(normalize_url(url).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key + '.html.gz')
+
+    def get(self, url, allow_stale=False):
+        """
+        This method returns the cached html for url, or None if it isn't
+            cached or has expired.
+
+        allow_stale: if True, an expired entry is returned too.  This is the
+                        fallback after a miss, so it isn't counted as one again
+        """
+        path = self._path(url)
+        try:
+            stat = os.stat(path)
+            fresh = time.time() - stat.st_mtime < self.ttls[page_type(url)]
+            if not fresh and not allow_stale:
+                html = None
+            else:
+                with gzip.open(path, 'rt', encoding='utf-8') as f:
+                    html = f.read()
+        except (OSError, EOFError):
+            html = None
+        if html is None:
+            if not allow_stale:
+                with self._lock:
+                    self.misses += 1
+            return None
+        now = time.time()
+        # the access time orders entries for eviction, the mtime is the age
+        os.utime(path, (now, stat.st_mtime))
+        with self._lock:
+            if fresh:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+        return html
+
+    def put(self, url, html):
+        """This method stores the html for url, evicting old entries if needed."""
+        path = self._path(url)
+        temp_path = path + '.' + str(threading.get_ident()) + '.tmp'
+        with gzip.open(temp_path, 'wt', encoding='utf-8') as f:
+            f.write(html)
+        try:
+            old_size = os.path.getsize(path)
+        except OSError:
+            old_size = 0
+        os.replace(temp_path, path)
+        with self._lock:
+            self._size += os.path.getsize(path) - old_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """
+        This method removes least recently used entries until the cache is
+            under LOW_WATER of max_bytes.
+        """
+        target = self.max_bytes * LOW_WATER
+        entries = [entry for entry in os.scandir(self.directory)
+                   if entry.name.endswith('.html.gz')]
+        entries.sort(key=lambda entry: entry.stat().st_atime)
+        for entry in entries:
+            if self._size <= target:
+                break
+            size = entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except OSError:
+                continue
+            self._size -= size
+            logging.info('Evicted cached page ' + entry.name)
+
+    def stats(self):
+        """This method returns a dictionary of the cache counters and size."""
+        return {'hits': self.hits, 'misses': self.misses,
+                'stale_hits': self.stale_hits, 'bytes': self._size}
+
+
+class CachedFetcher(Fetcher):
+    """This is a fetcher that serves pages from a PageCache when it can."""
+
+    def __init__(self, fetcher, cache):
+        self.fetcher = fetcher
+        self.cache = cache
+
+    def session(self):
+        return self.fetcher.session()
+
+    def fetch(self, url, marker=None):
+        html = self.cache.get(url)
+        if html is not None:
+            return html
+        try:
+            html = self.fetcher.fetch(url, marker)
+        except FetchError:
+            if self.cache.serve_stale:
+                html = self.cache.get(url, allow_stale=True)
+                if html is not None:
+                    logging.warning('Serving stale page for ' + url)
+                    return html
+            raise
+        self.cache.put(url, html)
+        return html
+
+    def close(self):
+        self.fetcher.close()
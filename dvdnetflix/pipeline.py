@@ -0,0 +1,199 @@
+"""
+This module contains an asyncio version of the library updater, where
+    fetching, parsing and writing run as separate stages:
+
+    titles -> fetch (threads, limited concurrency)
+           -> parse (process pool, produces MovieRecords)
+           -> write (a single writer applying the .nfo edits)
+
+The stages are connected by bounded queues, so a slow stage holds back the
+    ones before it instead of letting pages pile up in memory.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from collections import namedtuple
+from .scraper import NetflixSession
+from .cookie_store import CookieStore
+from .errors import NoMatchError
+from .batch_update import UpdatePolicy, Progress, find_titles
+from .movie_record import parse_movie_page
+from .rate_governor import shared_governor
+from .page_cache import normalize_url
+from .single_flight import SingleFlight
+from . import update_nfo_file
+import asyncio
+import logging
+import os
+
+# a title moving through the pipeline, with html then record filled in
+Job = namedtuple('Job', ['title', 'nfo', 'url', 'match', 'html', 'record'])
+
+STOP = None
+
+
+def fetch_job(session, job):
+    """
+    This function resolves the url of a job's title if needed, and fetches the
+        movie page.  It runs in a worker thread.
+    """
+    url = update_nfo_file.netflix_url(job.nfo)
+    match = None
+    if not url:
+        name, year = update_nfo_file.search_terms(job.nfo, job.title.kind,
+                                                  job.title.name)
+        match = session.resolve(name, year, interactive=False)
+        url = match.candidate[2]
+    # titles resolving to the same page share one fetch
+    html = session.single_flight.do(('html', normalize_url(url)),
+                                    session.fetcher.fetch, url, 'mdp-details')
+    return job._replace(url=url, match=match, html=html)
+
+
+async def _produce(titles, queue, loop, stages):
+    """This coroutine reads the .nfo files and feeds the fetch stage."""
+    for title in titles:
+        nfo = await loop.run_in_executor(None, update_nfo_file.read_nfo,
+                                         title.nfo_path)
+        await queue.put(Job(title, nfo, None, None, None, None))
+    for _ in range(stages):
+        await queue.put(STOP)
+
+
+async def _fetch(session, threads, inbox, outbox, loop, finish):
+    """This coroutine is one fetch worker, limited by the number of workers."""
+    while True:
+        job = await inbox.get()
+        if job is STOP:
+            await outbox.put(STOP)
+            return
+        try:
+            job = await loop.run_in_executor(threads, fetch_job, session, job)
+        except NoMatchError:
+            await finish(job, 'ambiguous', 'no match')
+            continue
+        except Exception as error:
+            logging.exception('Failed to fetch ' + job.title.nfo_path)
+            await finish(job, 'failed', 'error: ' + str(error))
+            continue
+        await outbox.put(job)
+
+
+async def _parse(processes, signed_in, inbox, outbox, loop, finish):
+    """This coroutine is one parse worker, handing pages to the process pool."""
+    while True:
+        job = await inbox.get()
+        if job is STOP:
+            await outbox.put(STOP)
+            return
+        try:
+            record = await loop.run_in_executor(
+                processes, parse_movie_page, job.html, job.url, signed_in)
+        except Exception as error:
+            logging.exception('Failed to parse ' + job.url)
+            await finish(job, 'failed', 'error: ' + str(error))
+            continue
+        if job.match:
+            name, year, _ = job.match.candidate
+            record = record._replace(name=name, year=year)
+        # the html isn't needed anymore, so don't keep it queued
+        await outbox.put(job._replace(html=None, record=record))
+
+
+async def _write(policy, inbox, stages, loop, finish):
+    """This coroutine is the single writer, applying edits one title at a time."""
+    stopped = 0
+    while stopped < stages:
+        job = await inbox.get()
+        if job is STOP:
+            stopped += 1
+            continue
+        if job.match and job.match.text_score < policy.min_score:
+            await finish(job, 'ambiguous', 'low score')
+            continue
+        try:
+            status = await loop.run_in_executor(None, write_job, policy, job)
+        except Exception as error:
+            logging.exception('Failed to write ' + job.title.nfo_path)
+            await finish(job, 'failed', 'error: ' + str(error))
+            continue
+        await finish(job, status)
+
+
+def write_job(policy, job):
+    """This function applies the record of a job to its .nfo file."""
+    if policy.record_store is not None:
+        policy.record_store.add(job.record, job.title.kind, job.title.nfo_path)
+    update_nfo_file.apply_selections(job.nfo, job.record,
+                                     policy.data_selections, job.title.kind,
+                                     policy.votes_must_increase, policy.artwork)
+    if not job.nfo.changed:
+        return 'unchanged'
+    update_nfo_file.write_nfo(job.title.nfo_path, job.nfo)
+    return 'updated'
+
+
+async def run_pipeline(titles, session, policy=None, fetch_concurrency=8,
+                       parse_workers=None, queue_size=16, report_every=10):
+    """
+    This coroutine updates the .nfo files of titles through the staged
+        pipeline, and returns a Counter of the outcomes.
+
+    titles: list of Titles, see batch_update.find_titles
+    session: a NetflixSession used to resolve searches and fetch pages
+    policy: an UpdatePolicy, defaults to UpdatePolicy()
+    fetch_concurrency: number of pages fetched at once
+    parse_workers: number of processes parsing pages (defaults to cpu count)
+    queue_size: number of titles each queue holds before blocking its producer
+    report_every: number of titles between progress reports
+    """
+    policy = policy or UpdatePolicy()
+    parse_workers = parse_workers or os.cpu_count() or 1
+    progress = Progress(len(titles), report_every)
+    loop = asyncio.get_running_loop()
+    to_fetch = asyncio.Queue(queue_size)
+    to_parse = asyncio.Queue(queue_size)
+    to_write = asyncio.Queue(queue_size)
+
+    async def finish(job, status, reason=None):
+        if reason:
+            policy.queue_for_review(job.title, reason=reason)
+        progress.update(status)
+
+    with policy.run_artwork(), \
+            ThreadPoolExecutor(fetch_concurrency) as threads, \
+            ProcessPoolExecutor(parse_workers) as processes:
+        signed_in = session.cookies is not None
+        await asyncio.gather(
+            _produce(titles, to_fetch, loop, fetch_concurrency),
+            *[_fetch(session, threads, to_fetch, to_parse, loop, finish)
+              for _ in range(fetch_concurrency)],
+            # every fetch worker sends one STOP, which stops one parse worker
+            *[_parse(processes, signed_in, to_parse, to_write, loop, finish)
+              for _ in range(fetch_concurrency)],
+            _write(policy, to_write, fetch_concurrency, loop, finish))
+    return progress.counts
+
+
+def update_library_async(movies_folder=None, tv_show_folder=None, policy=None,
+                         fetch_concurrency=8, parse_workers=None,
+                         cookies_file='./cookie.pkl', fetcher='http', **kwargs):
+    """
+    This function updates every title in the movie and TV show folders with
+        the staged pipeline, and returns a Counter of the outcomes.  See
+        run_pipeline for the options.
+
+    fetcher: the fetcher passed to NetflixSession, by default the http backend
+                with a fallback to the browsers
+    """
+    from .driver_pool import DriverPool
+    titles = list(find_titles(movies_folder, tv_show_folder))
+    cookie_store = CookieStore(cookies_file)
+    with DriverPool(size=min(fetch_concurrency, 4),
+                    cookie_store=cookie_store) as pool, \
+            NetflixSession(cookie_store=cookie_store, driver_pool=pool,
+                           fetcher=fetcher, governor=shared_governor(),
+                           fragments=True,
+                           single_flight=SingleFlight(keep=64)) as session:
+        return asyncio.run(run_pipeline(titles, session, policy,
+                                        fetch_concurrency, parse_workers,
+                                        **kwargs))
@@ -0,0 +1,175 @@
+"""
+This module contains the RateGovernor class, which schedules every page fetch
+    made by NetflixSessions so a batch runs as fast as the site allows.
+
+Requests are limited by a token bucket (requests per second) and by a number
+    of requests in flight.  Both grow additively while responses are healthy,
+    and are halved when a fetch times out or the site throttles us (AIMD).
+    Failed fetches are retried after an exponential backoff with jitter.
+"""
+
+from contextlib import contextmanager
+from .fetchers import Fetcher
+from .errors import FetchTimeout, ThrottledError
+import threading
+import logging
+import random
+import time
+
+# exceptions worth retrying, and which make the governor back off
+TRANSIENT_ERRORS = (FetchTimeout, ThrottledError)
+
+
+class RateGovernor:
+    """This is a class that limits, adapts and retries fetches."""
+
+    def __init__(self, rate=2., min_rate=.2, max_rate=10., rate_step=.2,
+                 concurrency=2, max_concurrency=16, increase_every=20,
+                 retries=3, backoff=1., max_backoff=30.):
+        """
+        rate: initial requests per second
+        min_rate, max_rate: bounds of the request rate
+        rate_step: requests per second added after a run of healthy responses
+        concurrency: initial number of requests in flight
+        max_concurrency: upper bound of requests in flight
+        increase_every: number of healthy responses before speeding up
+        retries: number of times a transient failure is retried
+        backoff: seconds before the first retry, doubled on each retry
+        max_backoff: upper bound of the seconds between retries
+        """
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate_step = rate_step
+        self.concurrency = concurrency
+        self.max_concurrency = max_concurrency
+        self.increase_every = increase_every
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.counters = {'requests': 0, 'successes': 0, 'failures': 0,
+                         'retries': 0, 'backoffs': 0}
+        self._tokens = 1.
+        self._last_refill = time.monotonic()
+        self._in_flight = 0
+        self._healthy = 0
+        self._condition = threading.Condition()
+
+    def _take_token(self):
+        """This method blocks until the token bucket allows another request."""
+        while True:
+            with self._condition:
+                now = time.monotonic()
+                # allow bursts of up to one second worth of requests
+                self._tokens = min(max(self.rate, 1.), self._tokens +
+                                   (now - self._last_refill) * self.rate)
+                self._last_refill = now
+                if self._tokens >= 1.:
+                    self._tokens -= 1.
+                    return
+                wait = (1. - self._tokens) / self.rate
+            time.sleep(wait)
+
+    @contextmanager
+    def slot(self):
+        """This method holds one of the concurrency slots for a request."""
+        with self._condition:
+            while self._in_flight >= self.concurrency:
+                self._condition.wait()
+            self._in_flight += 1
+        try:
+            self._take_token()
+            yield
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+
+    def on_success(self):
+        """This method records a healthy response, and speeds up after a run of them."""
+        with self._condition:
+            self.counters['successes'] += 1
+            self._healthy += 1
+            if self._healthy >= self.increase_every:
+                self._healthy = 0
+                self.rate = min(self.max_rate, self.rate + self.rate_step)
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+                self._condition.notify_all()
+
+    def on_failure(self):
+        """This method records a timeout or throttled response, and backs off."""
+        with self._condition:
+            self.counters['failures'] += 1
+            self.counters['backoffs'] += 1
+            self._healthy = 0
+            self.rate = max(self.min_rate, self.rate / 2.)
+            self.concurrency = max(1, self.concurrency // 2)
+        logging.warning('Backing off to %.2f requests/s, %d at once'
+                        % (self.rate, self.concurrency))
+
+    def call(self, function, *args, **kwargs):
+        """
+        This method runs function (a fetch) under the rate and concurrency
+            limits, and retries it with jittered backoff on transient errors.
+            The last error is raised once the retries are used up.
+        """
+        attempt = 0
+        while True:
+            with self._condition:
+                self.counters['requests'] += 1
+            try:
+                with self.slot():
+                    result = function(*args, **kwargs)
+            except TRANSIENT_ERRORS as error:
+                self.on_failure()
+                if attempt >= self.retries:
+                    raise
+                # full jitter, so retrying workers don't return in lockstep
+                delay = random.uniform(0, min(self.max_backoff,
+                                              self.backoff * 2 ** attempt))
+                logging.info('Retrying in %.1f s after: %s' % (delay, error))
+                with self._condition:
+                    self.counters['retries'] += 1
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self.on_success()
+            return result
+
+    def metrics(self):
+        """This method returns a dictionary of the current limits and counters."""
+        with self._condition:
+            metrics = dict(self.counters)
+            metrics.update({'rate': self.rate, 'concurrency': self.concurrency,
+                            'in_flight': self._in_flight})
+        return metrics
+
+
+_shared_governor = None
+_shared_lock = threading.Lock()
+
+
+def shared_governor():
+    """This function returns the RateGovernor shared by all sessions."""
+    global _shared_governor
+    with _shared_lock:
+        if _shared_governor is None:
+            _shared_governor = RateGovernor()
+        return _shared_governor
+
+
+class GovernedFetcher(Fetcher):
+    """This is a fetcher that runs every fetch through a RateGovernor."""
+
+    def __init__(self, fetcher, governor=None):
+        self.fetcher = fetcher
+        self.governor = governor or shared_governor()
+
+    def session(self):
+        return self.fetcher.session()
+
+    def fetch(self, url, marker=None):
+        return self.governor.call(self.fetcher.fetch, url, marker)
+
+    def close(self):
+        self.fetcher.close()
@@ -0,0 +1,152 @@
+"""
+This module contains refresh_ratings, a fast refresh of the average rating
+    and votes of every title whose .nfo file already has a dvd-netflix-url tag.
+
+Ratings change weekly, while plots and genres almost never do, so this skips
+    the search, reads the url and votes of each .nfo file with a regular
+    expression instead of parsing the XML, parses only the ratings of each
+    page, and only rewrites the files whose number of votes went up.
+
+    >>> from ratings_refresh import refresh_ratings
+    >>> refresh_ratings('/path/to/Movies/', '/path/to/TV/', max_workers=8)
+"""
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from collections import namedtuple
+from xml.sax.saxutils import unescape
+from .scraper import NetflixSession
+from .batch_update import Progress, find_titles
+from .errors import NotSignedInError
+from .movie_record import parse_ratings
+from .page_cache import normalize_url
+from .rate_governor import shared_governor
+from .single_flight import SingleFlight
+from . import update_nfo_file
+from . import instrumentation
+import logging
+import re
+
+# the first element of each of these, like NfoEditor.get_text
+TAGS = re.compile(rb'<(dvd-netflix-url|votes)>([^<]*)</\1>')
+
+NfoRatings = namedtuple('NfoRatings', ['url', 'votes'])
+
+
+def read_ratings(path):
+    """
+    This function returns the NfoRatings of a .nfo file without parsing it,
+        or None if it has no dvd-netflix-url tag.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    found = {}
+    for match in TAGS.finditer(data):
+        found.setdefault(match.group(1), match.group(2).strip())
+    url = found.get(b'dvd-netflix-url')
+    if not url:
+        return None
+    votes = found.get(b'votes', b'')
+    return NfoRatings(unescape(url.decode('utf-8')),
+                      int(votes) if votes.isdigit() else 0)
+
+
+def refresh_title(session, title, manifest=None):
+    """
+    This function refreshes the rating and votes of one title, and returns
+        'updated', 'unchanged', 'no url' or 'no ratings'.
+
+    manifest: a LibraryManifest, where the title's ratings are recorded as
+                scraped once they are checked, so the run's own write isn't
+                seen as an edit
+    """
+    nfo_ratings = read_ratings(title.nfo_path)
+    if nfo_ratings is None:
+        return 'no url'
+    # titles sharing a page share one fetch
+    ratings = session.single_flight.do(
+        ('ratings', normalize_url(nfo_ratings.url)), fetch_ratings, session,
+        nfo_ratings.url)
+    if ratings is None:
+        return 'no ratings'
+    _, avg_rating, num_votes = ratings
+    status = 'unchanged'
+    if num_votes > nfo_ratings.votes:
+        nfo = update_nfo_file.read_nfo(title.nfo_path)
+        update_nfo_file.update_rating(nfo, avg_rating, num_votes)
+        update_nfo_file.write_nfo(title.nfo_path, nfo)
+        status = 'updated'
+    if manifest is not None:
+        manifest.mark_scraped(title, {'avg-rating'}, nfo_ratings.url)
+    return status
+
+
+def fetch_ratings(session, url):
+    """
+    This function fetches a movie/show page, and returns its parsed ratings,
+        or None if it has none.  The page is awaited by its details, which
+        every page has, since titles without ratings have no ratingInfo.
+    """
+    with instrumentation.span('detail_fetch'):
+        html = session.fetcher.fetch(url, 'mdp-details')
+    with instrumentation.span('parse'):
+        return parse_ratings(html)
+
+
+def refresh_ratings(movies_folder=None, tv_show_folder=None, session=None,
+                    max_workers=8, cookies_file='./cookie.pkl', titles=None,
+                    report_every=100, manifest=None):
+    """
+    This function refreshes the ratings of every title in the movie and TV
+        show folders on a bounded pool of threads sharing one session, and
+        returns a Counter of the outcomes.
+
+    movies_folder: string of path to movies (each in its own folder)
+    tv_show_folder: string of path to TV shows (each in its own folder)
+    session: a signed in NetflixSession, by default one fetching over http
+                (falling back to a browser) with the shared rate governor
+    max_workers: number of titles refreshed at once
+    cookies_file: string of path to a JSON or pickle file containing cookies,
+                used when no session is given
+    titles: list of Titles to refresh instead of the folders' contents
+    report_every: number of titles between progress reports
+    manifest: a LibraryManifest updated with every title refreshed, see
+                refresh_title
+    """
+    owns_session = session is None
+    if owns_session:
+        session = NetflixSession(cookies_file, fetcher='http',
+                                 governor=shared_governor(),
+                                 single_flight=SingleFlight(keep=256))
+    if session.cookies is None:
+        # ratings are only shown to signed in sessions
+        if owns_session:
+            session.close()
+        raise NotSignedInError('Refreshing ratings needs cookies')
+    if titles is None:
+        titles = list(find_titles(movies_folder, tv_show_folder))
+    progress = Progress(len(titles), report_every)
+
+    def work(title):
+        try:
+            with instrumentation.span('refresh_title', kind=title.kind):
+                return refresh_title(session, title, manifest)
+        except Exception:
+            logging.exception('Failed to refresh ' + title.nfo_path)
+            return 'failed'
+
+    try:
+        with ThreadPoolExecutor(max_workers) as executor:
+            # only keep a few titles queued, so a huge library isn't submitted at once
+            pending = set()
+            for title in titles:
+                if len(pending) >= 2 * max_workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        progress.update(future.result())
+                pending.add(executor.submit(work, title))
+            for future in pending:
+                progress.update(future.result())
+    finally:
+        if owns_session:
+            session.close()
+    return progress.counts
@@ -0,0 +1,292 @@
+"""
+This module contains the RecordStore class, which keeps every scraped
+    MovieRecord in SQLite, so questions about the whole library (the lowest
+    rated titles, the most common moods, ...) don't need the .nfo files.
+
+Records are appended in batches, and never updated: every scrape of a title
+    adds a row, and queries use the latest row of each title.  The store can
+    be backfilled from existing .nfo files, and exported to Parquet.
+"""
+
+from xml.parsers.expat import ExpatError
+from collections import namedtuple
+from .movie_record import MovieRecord
+from .page_cache import normalize_url
+import threading
+import logging
+import sqlite3
+import time
+
+StoredRecord = namedtuple('StoredRecord', MovieRecord._fields +
+                          ('kind', 'nfo_path', 'source', 'scraped_at'))
+
+# columns of the records table, in the order of StoredRecord
+COLUMNS = ('url', 'name', 'year', 'synopsis', 'guess_rating', 'avg_rating',
+           'num_votes', 'image', 'kind', 'nfo_path', 'source', 'scraped_at')
+
+# orders accepted by RecordStore.find
+ORDERS = {'name': 'name', 'year': 'year', 'avg_rating': 'avg_rating',
+          'num_votes': 'num_votes', 'scraped_at': 'scraped_at'}
+
+
+def title_key(record, nfo_path=None):
+    """This function returns what identifies a title across scrapes."""
+    if nfo_path:
+        return nfo_path
+    if record.url:
+        return normalize_url(record.url)
+    return '%s (%s)' % (record.name, record.year)
+
+
+def record_from_nfo(nfo, kind):
+    """
+    This function returns a MovieRecord of the data already in a .nfo file.
+        Kodi ratings are out of 10, and genres and moods share genre tags.
+    """
+    rating = nfo.get_text('rating')
+    votes = nfo.get_text('votes')
+    year = nfo.get_text('year')
+    if not year and kind == 'tvshow' and nfo.get_text('premiered'):
+        year = nfo.get_text('premiered')[0:4]
+    genres = [genre.strip() for text in nfo.find_all_text('genre')
+              for genre in text.split(' / ') if genre.strip()]
+    return MovieRecord(url=nfo.get_text('dvd-netflix-url'),
+                       name=nfo.get_text('title'),
+                       year=int(year) if year else None,
+                       synopsis=nfo.get_text('plot') or None,
+                       genres=tuple(genres), moods=None, guess_rating=None,
+                       avg_rating=float(rating) / 2. if rating else None,
+                       num_votes=int(votes) if votes else None, image=None)
+
+
+class RecordStore:
+    """This is a class that appends MovieRecords to SQLite, and queries them."""
+
+    def __init__(self, path='./records.sqlite', batch_size=500):
+        """
+        path: string of path to the SQLite database file
+        batch_size: number of records buffered before they are written
+        """
+        self.batch_size = batch_size
+        self._pending = []
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript('''
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS records (
+                id INTEGER PRIMARY KEY,
+                title_key TEXT NOT NULL,
+                url TEXT,
+                name TEXT,
+                year INTEGER,
+                synopsis TEXT,
+                guess_rating REAL,
+                avg_rating REAL,
+                num_votes INTEGER,
+                image TEXT,
+                kind TEXT,
+                nfo_path TEXT,
+                source TEXT NOT NULL,
+                scraped_at REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS genres (
+                record_id INTEGER NOT NULL,
+                genre TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS moods (
+                record_id INTEGER NOT NULL,
+                mood TEXT NOT NULL);
+            CREATE INDEX IF NOT EXISTS records_title ON records (title_key, id);
+            CREATE INDEX IF NOT EXISTS records_name ON records (name);
+            CREATE INDEX IF NOT EXISTS records_year ON records (year);
+            CREATE INDEX IF NOT EXISTS genres_genre ON genres (genre, record_id);
+            CREATE INDEX IF NOT EXISTS genres_record ON genres (record_id);
+            CREATE INDEX IF NOT EXISTS moods_mood ON moods (mood, record_id);
+            CREATE INDEX IF NOT EXISTS moods_record ON moods (record_id);
+            -- the most recent row of every title
+            CREATE VIEW IF NOT EXISTS latest AS
+                SELECT * FROM records WHERE id IN
+                    (SELECT MAX(id) FROM records GROUP BY title_key);
+        ''')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(self, record, kind=None, nfo_path=None, source='scrape', now=None):
+        """
+        This method queues a MovieRecord, e.g. NetflixSession.extract(), and
+            writes the queue once it holds batch_size records.
+
+        kind: 'movie' or 'tvshow'
+        nfo_path: string of path to the title's .nfo file
+        source: 'scrape' for scraped records, 'nfo' for backfilled ones
+        """
+        row = (record, kind, nfo_path, source, now or time.time())
+        with self._lock:
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_size:
+                self._write()
+
+    def flush(self):
+        """This method writes the queued records."""
+        with self._lock:
+            self._write()
+
+    def _write(self):
+        """This method writes the queued records in one transaction."""
+        if not self._pending:
+            return
+        with self._db:
+            for record, kind, nfo_path, source, scraped_at in self._pending:
+                cursor = self._db.execute(
+                    'INSERT INTO records (title_key, ' + ', '.join(COLUMNS) + ') '
+                    'VALUES (' + ', '.join('?' * (len(COLUMNS) + 1)) + ')',
+                    (title_key(record, nfo_path), record.url, record.name,
+                     record.year, record.synopsis, record.guess_rating,
+                     record.avg_rating, record.num_votes, record.image, kind,
+                     nfo_path, source, scraped_at))
+                record_id = cursor.lastrowid
+                self._db.executemany('INSERT INTO genres VALUES (?, ?)',
+                                     [(record_id, genre) for genre in record.genres])
+                self._db.executemany('INSERT INTO moods VALUES (?, ?)',
+                                     [(record_id, mood) for mood in record.moods or ()])
+        self._pending = []
+
+    def backfill(self, titles):
+        """
+        This method adds the data of existing .nfo files in one bulk pass, and
+            returns the number of records added.  Files that can't be read or
+            parsed, or hold values that aren't numbers where numbers belong
+            (e.g. votes of "1,234"), are logged and skipped.
+
+        titles: list of Titles, see batch_update.find_titles
+        """
+        from .nfo_editor import NfoEditor
+        count = 0
+        for title in titles:
+            try:
+                record = record_from_nfo(NfoEditor(title.nfo_path), title.kind)
+            except (OSError, ExpatError, ValueError) as error:
+                logging.warning('Skipped backfilling %s: %s' % (title.nfo_path, error))
+                continue
+            self.add(record, title.kind, title.nfo_path, source='nfo')
+            count += 1
+        self.flush()
+        return count
+
+    def _stored(self, rows):
+        """This method returns StoredRecords, with their genres and moods, for rows."""
+        rows = list(rows)
+        ids = [row[0] for row in rows]
+        genres, moods = {}, {}
+        # look up the tags in chunks, below SQLite's limit of query parameters
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            marks = ', '.join('?' * len(chunk))
+            for record_id, genre in self._db.execute(
+                    'SELECT record_id, genre FROM genres WHERE record_id IN ('
+                    + marks + ') ORDER BY rowid', chunk):
+                genres.setdefault(record_id, []).append(genre)
+            for record_id, mood in self._db.execute(
+                    'SELECT record_id, mood FROM moods WHERE record_id IN ('
+                    + marks + ') ORDER BY rowid', chunk):
+                moods.setdefault(record_id, []).append(mood)
+        records = []
+        for row in rows:
+            values = dict(zip(COLUMNS, row[1:]))
+            record_moods = moods.get(row[0])
+            records.append(StoredRecord(
+                genres=tuple(genres.get(row[0], ())),
+                moods=tuple(record_moods) if record_moods else None, **values))
+        return records
+
+    def find(self, name=None, year=None, genre=None, mood=None, min_rating=None,
+             max_rating=None, min_votes=None, order_by='name', descending=False,
+             limit=None):
+        """
+        This method returns the latest StoredRecord of every title matching
+            all of the given filters.
+
+        name: substring of the title name (case-insensitive)
+        order_by: 'name', 'year', 'avg_rating', 'num_votes' or 'scraped_at'
+        """
+        clauses, params = [], []
+        if name is not None:
+            clauses.append('name LIKE ?')
+            params.append('%' + name + '%')
+        if year is not None:
+            clauses.append('year = ?')
+            params.append(year)
+        if genre is not None:
+            clauses.append('id IN (SELECT record_id FROM genres WHERE genre = ?)')
+            params.append(genre)
+        if mood is not None:
+            clauses.append('id IN (SELECT record_id FROM moods WHERE mood = ?)')
+            params.append(mood)
+        if min_rating is not None:
+            clauses.append('avg_rating >= ?')
+            params.append(min_rating)
+        if max_rating is not None:
+            clauses.append('avg_rating <= ?')
+            params.append(max_rating)
+        if min_votes is not None:
+            clauses.append('num_votes >= ?')
+            params.append(min_votes)
+        sql = 'SELECT id, ' + ', '.join(COLUMNS) + ' FROM latest'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY ' + ORDERS[order_by] + (' DESC' if descending else '')
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        self.flush()
+        with self._lock:
+            return self._stored(self._db.execute(sql, params))
+
+    def lowest_rated(self, limit=10, min_votes=0):
+        """This method returns the lowest rated titles with at least min_votes."""
+        return self.find(min_rating=0, min_votes=min_votes, order_by='avg_rating',
+                         limit=limit)
+
+    def distribution(self, tag='mood'):
+        """
+        This method returns a list of (tag, number of titles) tuples, most
+            common first, of the 'mood' or 'genre' tags of every title.
+        """
+        table = {'mood': 'moods', 'genre': 'genres'}[tag]
+        self.flush()
+        with self._lock:
+            return self._db.execute(
+                'SELECT ' + tag + ', COUNT(*) AS titles FROM ' + table +
+                ' WHERE record_id IN (SELECT id FROM latest)'
+                ' GROUP BY ' + tag + ' ORDER BY titles DESC, ' + tag).fetchall()
+
+    def history(self, key):
+        """This method returns every StoredRecord of a title, oldest first."""
+        self.flush()
+        with self._lock:
+            return self._stored(self._db.execute(
+                'SELECT id, ' + ', '.join(COLUMNS) + ' FROM records '
+                'WHERE title_key = ? ORDER BY id', (key,)))
+
+    def export_parquet(self, path):
+        """
+        This method writes the latest record of every title to a Parquet file
+            (needs pyarrow), and returns the number of rows written.
+        """
+        import pyarrow
+        import pyarrow.parquet
+        records = self.find()
+        columns = {field: [getattr(record, field) for record in records]
+                   for field in StoredRecord._fields}
+        columns['genres'] = [list(genres) for genres in columns['genres']]
+        columns['moods'] = [list(moods) if moods else None for moods in columns['moods']]
+        pyarrow.parquet.write_table(pyarrow.table(columns), path)
+        return len(records)
+
+    def close(self):
+        """This method writes the queued records, and closes the database."""
+        with self._lock:
+            self._write()
+            self._db.close()
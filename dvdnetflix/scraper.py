@@ -0,0 +1,493 @@
+"""This module contains the NetflixSession class."""
+
+from .movie_record import parse_html, parse_movie_fragments, parse_search_results, \
+    extract_movie_record
+from .matching import Match, best_match, normalize_title
+from .fetchers import SeleniumFetcher, HttpFetcher, FallbackFetcher, LoadStats
+from .errors import FetchTimeout, SearchResultsError, NoMatchError
+from .page_cache import CachedFetcher, normalize_url
+from .rate_governor import GovernedFetcher
+from .cookie_store import CookieStore
+from .single_flight import SingleFlight
+from urllib.parse import urljoin
+from collections import namedtuple
+from . import instrumentation
+import logging
+
+
+def load_cookies(cookies_file):
+    """
+    This function returns the list of unexpired cookies in cookies_file (JSON,
+        or pickled if it ends in .pkl), or None if the file can't be loaded.
+    """
+    return CookieStore(cookies_file).load()
+
+
+# a loaded movie/show, where match_score is None for titles loaded by url
+LoadedTitle = namedtuple('LoadedTitle', ['url', 'name', 'year', 'match_score', 'record'])
+
+# the outcome of one query of load_many, with either a LoadedTitle or an error
+LoadResult = namedtuple('LoadResult', ['query', 'title', 'error'])
+
+
+def next_page_url(search_content, search_url, page_number):
+    """
+    This function returns the url of the search results page after
+        page_number, from the pagination links, or None on the last page.
+    """
+    pagination = search_content.find(attrs={'class': 'pagination'})
+    if pagination is None:
+        return None
+    for link in pagination.find_all('a', href=True):
+        if link.get_text().strip() == str(page_number + 1) or \
+                'next' in (link.get('rel') or ()) or 'next' in (link.get('class') or ()):
+            return urljoin(search_url, link['href'])
+    return None
+
+
+class NetflixSession:
+    """This is a class capable of scraping DVD Netflix pages."""
+
+    # the most pages of results a search reads
+    search_pages = 3
+    # text score of a result that stops a search from reading further pages
+    confident_score = 90
+
+    def __init__(self, cookies_file='./cookie.pkl', driver_pool=None,
+                 pool_size=None, max_uses=50, fetcher=None,
+                 base_url='https://dvd.netflix.com', cache=None,
+                 title_index=None, governor=None, cookie_store=None,
+                 profile_dir=None, lean=False, fragments=False,
+                 single_flight=None):
+        """
+        Create instance of class for scraping movie.  Tries to load a
+            set of cookies with this instance, which are required to view
+            unavailable movies/shows, and are needed to get ratings.
+
+        cookies_file: string of path to a JSON or pickle (.pkl) file
+                        containing cookies (if cookies aren't loaded, script
+                        will continue without them)
+        driver_pool: a DriverPool shared with other sessions, used instead
+                        of starting a new browser for every load
+        pool_size: if given (and no driver_pool), the session owns a pool of
+                        this many headless browsers, closed by close()
+        max_uses: number of loads before a browser in an owned pool is recycled
+        fetcher: a Fetcher used to retrieve pages, or 'http' to try the fast
+                        http backend first and fall back to selenium
+                        (defaults to the selenium backend)
+        base_url: string of the site to scrape, which can be pointed at a
+                        local server serving recorded pages
+        cache: a PageCache of previously fetched search and movie pages
+        title_index: a TitleIndex used to resolve searches without loading
+                        the search page, and filled from every page loaded
+        governor: a RateGovernor scheduling and retrying every fetch, e.g.
+                        rate_governor.shared_governor() to share it between
+                        all sessions
+        cookie_store: a CookieStore used instead of cookies_file, e.g. one
+                        shared with a DriverPool
+        profile_dir: string of path to a folder of persistent Chrome profiles,
+                        so cookies are only installed on the first launch
+                        (implies an owned pool of one browser if neither
+                        driver_pool nor pool_size is given)
+        lean: if True, the browsers started by the session run headless,
+                stop loading once the html is parsed, and skip images, fonts,
+                media and third party hosts.  load_stats reports the bytes
+                and time of every lean browser load (and of normal loads
+                while instrumentation is enabled).
+        fragments: if True, only the scraped elements of each page are
+                parsed and kept, and a search with a year stops at the
+                first result matching name and year exactly, which saves
+                time and memory when many sessions are alive
+        single_flight: a SingleFlight shared with other sessions, so loads of
+                the same page or search share one fetch and parse.  By
+                default, only the session's own concurrent loads are shared.
+        """
+        self.cookie_store = cookie_store or CookieStore(cookies_file)
+        self.cookies = self.cookie_store.get()
+        if profile_dir and driver_pool is None and pool_size is None:
+            pool_size = 1
+        self._owns_pool = driver_pool is None and pool_size is not None
+        if self._owns_pool:
+            from .driver_pool import DriverPool
+            driver_pool = DriverPool(size=pool_size, max_uses=max_uses,
+                                     cookie_store=self.cookie_store,
+                                     profile_dir=profile_dir, lean=lean)
+        self.driver_pool = driver_pool
+        self.load_stats = LoadStats()
+        selenium_fetcher = SeleniumFetcher(self.cookies, driver_pool,
+                                           cookie_store=self.cookie_store,
+                                           lean=lean, load_stats=self.load_stats)
+        if fetcher is None:
+            fetcher = selenium_fetcher
+        elif fetcher == 'http':
+            fetcher = FallbackFetcher(HttpFetcher(self.cookies,
+                                                  cookie_store=self.cookie_store),
+                                      selenium_fetcher)
+        # cached pages don't count against the rate limit
+        if governor is not None:
+            fetcher = GovernedFetcher(fetcher, governor)
+        if cache is not None:
+            fetcher = CachedFetcher(fetcher, cache)
+        self.fetcher = fetcher
+        self.cache = cache
+        self.title_index = title_index
+        self.governor = governor
+        self.base_url = base_url
+        self.fragments = fragments
+        self.single_flight = single_flight or SingleFlight()
+        self.movie_name = self.movie_year = self.movie_url = None
+        self.movie_page = self.record = self.match_score = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        This method closes the fetcher, and the driver pool if the session owns
+            one, and saves the cookies captured from the site.
+        """
+        self.fetcher.close()
+        if self._owns_pool:
+            self.driver_pool.close()
+        self.cookie_store.save()
+
+    def load_movie(self, search_name, search_year=None, interactive=True):
+        """
+        This method loads the Netflix page for the movie/show.  Must be called
+            before requesting scraped data for movie.  Sets the instance
+            variables movie_name, movie_year, movie_page and match_score
+
+        search_name: string of the the name of the movie/show being searched
+        search_year: if available, only a movie/show within 2 years of specified
+                        year will be loaded
+        interactive: if False, NoMatchError is raised when no result matches,
+                        instead of asking the user to select one
+        """
+
+        title, page = self._lookup(search_name, search_year, interactive)
+        self._set_loaded(title, page)
+
+    def lookup(self, search_name, search_year=None, interactive=False):
+        """
+        This method finds and loads the movie/show for a search, and returns a
+            LoadedTitle.  It doesn't change the loaded movie, so one session
+            can look up titles from many threads at once.
+
+        interactive: if True, the user is asked to select a result when none
+                        matches, otherwise NoMatchError is raised
+        """
+        return self._lookup(search_name, search_year, interactive)[0]
+
+    def fetch(self, movie_url):
+        """
+        This method loads the movie/show at movie_url, and returns a LoadedTitle.
+            Like lookup, it doesn't change the loaded movie.
+        """
+        return self._fetch(movie_url)[0]
+
+    def load_many(self, queries, max_workers=4):
+        """
+        This method looks up many titles on a pool of threads sharing this
+            session, and yields a LoadResult for each as soon as it's loaded.
+            Errors are returned in the results instead of raised.
+
+        queries: iterable of search names, or (name, year) tuples
+        max_workers: number of titles loaded at once (give the session a
+                        pool of as many browsers, or the http fetcher)
+        """
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+        def load(query):
+            name, year = (query, None) if isinstance(query, str) else query
+            try:
+                return LoadResult(query, self.lookup(name, year), None)
+            except Exception as error:
+                logging.error('Failed to load ' + str(name) + ': ' + str(error))
+                return LoadResult(query, None, error)
+
+        with ThreadPoolExecutor(max_workers) as executor:
+            # only keep a few queries queued, so a long list isn't submitted at once
+            pending = set()
+            for query in queries:
+                if len(pending) >= 2 * max_workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+                pending.add(executor.submit(load, query))
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+    def _lookup(self, search_name, search_year, interactive):
+        """This method returns the LoadedTitle of a search, and its parsed page."""
+        with instrumentation.span('load_movie'):
+            with self.fetcher.session():
+                match = self.resolve(search_name, search_year, interactive)
+            name, year, url = match.candidate
+            logging.info('movie url: ' + url)
+            # the search's browser is released first, since the page load may
+            # wait for another thread's load of the page, which needs a browser
+            page, record = self._load_page(url)
+        # the name and year are those of the search result
+        record = record._replace(name=name, year=year)
+        return LoadedTitle(url, name, year, match.text_score, record), page
+
+    def _fetch(self, movie_url):
+        """This method returns the LoadedTitle at movie_url, and its parsed page."""
+        with instrumentation.span('load_movie_with_url'):
+            page, record = self._load_page(movie_url)
+        if self.title_index:
+            self.title_index.add(record.name, record.year, movie_url)
+        return LoadedTitle(movie_url, record.name, record.year, None, record), page
+
+    def _load_page(self, movie_url):
+        """
+        This method returns the parsed movie/show page at movie_url and its
+            MovieRecord, shared with concurrent loads of the same page.  It
+            must not be called inside a fetcher session that holds a browser.
+        """
+        page, record = self.single_flight.do(('page', normalize_url(movie_url)),
+                                             self._load_page_once, movie_url)
+        return page, record._replace(url=movie_url)
+
+    def _load_page_once(self, movie_url):
+        """This method fetches, parses and extracts a movie/show page."""
+        with instrumentation.span('detail_fetch'):
+            html = self.fetcher.fetch(movie_url, 'mdp-details')
+        with instrumentation.span('parse'):
+            page = self._parse_movie_page(html)
+        return page, self._extract(page, movie_url)
+
+    def _extract(self, page, movie_url):
+        """This method returns the MovieRecord of a parsed movie/show page."""
+        with instrumentation.span('extract'):
+            return extract_movie_record(page, movie_url,
+                                        signed_in=self.cookies is not None)
+
+    def _set_loaded(self, title, page):
+        """This method makes a LoadedTitle the session's loaded movie."""
+        self.movie_url, self.movie_name, self.movie_year = title.url, title.name, title.year
+        self.match_score = title.match_score
+        self.movie_page = page
+        self.record = title.record
+
+    def resolve(self, search_name, search_year=None, interactive=True):
+        """
+        This method finds the movie/show for a search without loading its page,
+            and returns the Match, whose candidate is a (name, year, url) tuple.
+            The local title index is tried before searching the site.
+            It doesn't change the loaded movie, and concurrent resolves of the
+            same search share one.
+        """
+        return self.single_flight.do(
+            ('search', ' '.join(search_name.lower().split()), search_year, interactive),
+            self._resolve, search_name, search_year, interactive)
+
+    def _resolve(self, search_name, search_year, interactive):
+        """This method resolves a search with the title index, or the site."""
+        if self.title_index:
+            match = self.title_index.lookup(search_name, search_year)
+            if match:
+                logging.info('title index match: ' + match.candidate[0])
+                instrumentation.count('title_index_hits')
+                return match
+        return self._search(search_name, search_year, interactive)
+
+    def search(self, search_name, search_year=None, max_pages=None):
+        """
+        This method yields the results of a search one page at a time, as
+            lists of (name, year, url) tuples.  The next page is only fetched
+            when the previous one was consumed.  SearchResultsError is raised
+            if the first page doesn't load.
+
+        search_year: if given, with fragments, a page stops being read at the
+                        first exact match of name and year, and no further
+                        pages are fetched.  Without it, whole pages are read,
+                        since a namesake later on may be the wanted title
+        max_pages: maximum number of pages fetched, by default search_pages
+        """
+
+        # insert search string into url (effectively searching for 'search_name search_year')
+        search_url = self.base_url + '/Search?oq=&ac_posn=&search_submit=&v1=' + \
+            search_name.replace(' ', '+')
+        # adding the year helps when the search name is the name of a genre,
+        #   like 'Halloween', but leads to bad results too often
+        # if search_year:
+        #    search_url = search_url + '+' + str(search_year)
+        logging.info('search url: ' + search_url)
+        exact_name = normalize_title(search_name)
+
+        for page_number in range(max_pages or self.search_pages):
+            # retrieve search page, and wait for results to load
+            try:
+                with instrumentation.span('search_fetch'):
+                    html = self.fetcher.fetch(search_url, 'searchResultsItems')
+            except FetchTimeout:
+                if page_number == 0:
+                    logging.error("Search results did not load.")
+                    raise SearchResultsError('Search results did not load.')
+                logging.warning('Page %d of the search results did not load'
+                                % (page_number + 1))
+                return
+            if page_number == 0:
+                instrumentation.count('searches')
+            instrumentation.count('search_pages')
+
+            # parse html using BeautifulSoup to find search results
+            with instrumentation.span('parse'):
+                if self.fragments:
+                    search_content = parse_search_results(html)
+                else:
+                    search_content = parse_html(html).find(id="search-body")
+            slider = search_content.find(id='SliderContainer')
+            result_list = [] if slider is None else slider.find_all(
+                attrs={"class": "movieSearchDetails"})
+            results = []
+            exact = False
+            for result in result_list:
+                result_name = result.find('a').get_text()
+                result_year = int(result.find(
+                    attrs={"class": "year"}).get_text())
+                result_url = urljoin(search_url, result.find('a').get('href'))
+                results.append((result_name, result_year, result_url))
+                # no later result can beat an exact match, so skip reading them
+                if self.fragments and normalize_title(result_name) == exact_name \
+                        and result_year == search_year:
+                    exact = True
+                    break
+
+            # remember every result, so later loads can skip the search page
+            if self.title_index:
+                self.title_index.add_many(results)
+            yield results
+
+            next_url = None if exact else next_page_url(search_content, search_url,
+                                                        page_number + 1)
+            if next_url is None:
+                return
+            search_url = next_url
+
+    def _search(self, search_name, search_year=None, interactive=True):
+        """
+        This method searches the site, and returns the best Match among the
+            results for search_name (and search_year if given).  Further
+            pages of results are only read until a match scores at least
+            confident_score.  If no result matches, the user is asked to
+            select one if interactive.
+        """
+        results = []
+        match = None
+        for page in self.search(search_name, search_year):
+            results.extend(page)
+            # find the best text and year(optional) match among the results
+            with instrumentation.span('match'):
+                match = best_match(search_name, results, search_year,
+                                   min_score=80,  # value open to tweaking
+                                   max_year_diff=1)
+            if match and match.text_score >= self.confident_score:
+                break
+        if match:
+            return match
+
+        logging.error('No matching movies were found')
+        instrumentation.count('unmatched_searches')
+        if not interactive:
+            raise NoMatchError('No matching movies were found')
+        # print results and manually select
+        print('No matches found.  Did you mean...')
+        for index, result in list(enumerate(results)):
+            print(str(index) + ' ' + result[0] + ' ' + str(result[1]))
+        print(str(len(results)) + ' None of these')
+        selection = int(input('Select one: '))
+        if selection < len(results):
+            # a result picked by the user is as good as an exact match
+            return Match(100, 100, results[selection], selection)
+        raise NoMatchError('No matching movies were found')
+
+    def load_movie_with_url(self, movie_url):
+        """
+        This method loads the Netflix page for the movie/show.  Must be called
+            before requesting scraped data for movie.  Sets the instance
+            variables movie_name, movie_year, and movie_page
+
+        movie_url: a string of a direct link to the webpage
+        """
+
+        self._set_loaded(*self._fetch(movie_url))
+
+    def _parse_movie_page(self, html):
+        """This method parses a movie page, or only its scraped elements."""
+        if self.fragments:
+            return parse_movie_fragments(html)
+        return parse_html(html)
+
+    def extract(self):
+        """
+        This method walks the loaded movie page once, and returns a MovieRecord
+            of all the scraped data.  The record is cached until the next load,
+            and the name and year are those chosen when the movie was loaded.
+        """
+        if self.record is None:
+            record = self._extract(self.movie_page, self.movie_url)
+            if self.movie_name is not None:
+                record = record._replace(name=self.movie_name,
+                                         year=self.movie_year)
+            self.record = record
+        return self.record
+
+    def get_movie_url(self):
+        """This methods returns the url of the loaded movie."""
+        return self.movie_url
+
+    def get_synopsis(self):
+        """This methods parses movie page and returns the synopsis."""
+        return self.extract().synopsis
+
+    def get_genres(self):
+        """This methods parses movie page and returns list of genres."""
+        return list(self.extract().genres)
+
+    def get_moods(self):
+        """This methods parses movie page and returns list of moods (if present)."""
+        moods = self.extract().moods
+        if moods is None:
+            logging.info('No moods found for this movie/show.')
+            return None
+        return list(moods)
+
+    def get_guess_rating(self):
+        """
+        This methods parses movie page and returns best guess rating
+            or None if no cookies were provided
+        """
+        return self.extract().guess_rating
+
+    def get_avg_rating(self):
+        """
+        This method parses movie page and returns avg rating
+            or None if no cookies were provided
+        """
+        return self.extract().avg_rating
+
+    def get_num_votes(self):
+        """
+        This method parses movie page and returns number of votes for avg rating
+            or None if no cookies were provided
+        """
+        return self.extract().num_votes
+
+    def get_image_link(self):
+        """This method parses movie page and returns the link to the image"""
+        return self.extract().image
+
+    def get_movie_name(self):
+        """This method returns a string of the loaded movie's name"""
+        return self.movie_name
+
+    def get_movie_year(self):
+        """This method returns a string of the loaded movie's year"""
+        return self.movie_year
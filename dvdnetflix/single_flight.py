@@ -0,0 +1,95 @@
+"""
+This module contains the SingleFlight class, which makes concurrent loads of
+    the same page share one fetch and one parse.
+
+Libraries often hold several titles resolving to the same page (editions,
+    cuts, duplicate folders), and searches that recur (a TV show and its
+    specials).  While a load is in flight, every other caller with the same
+    key waits for it and gets its result, instead of loading the page again.
+    With keep > 0, the results of the most recent loads are also reused for
+    the rest of the run.
+"""
+
+from collections import OrderedDict, Counter
+from . import instrumentation
+import threading
+
+
+class _Call:
+    """This is a load in flight, which the callers sharing it wait for."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = self.error = None
+
+
+class SingleFlight:
+    """This is a class that runs one call per key at a time, and shares its result."""
+
+    def __init__(self, keep=0):
+        """
+        keep: number of results of finished calls kept and reused for later
+                callers of the same key (0 only shares calls in flight).
+                Failed calls are never kept, so they are tried again.
+        """
+        self.keep = keep
+        self.counts = Counter()
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._done = OrderedDict()
+
+    def do(self, key, function, *args):
+        """
+        This method returns function(*args), or the result of the call with
+            the same key that is in flight or kept.  An error of the shared
+            call is raised to every caller waiting on it.
+        """
+        with self._lock:
+            if key in self._done:
+                self._done.move_to_end(key)
+                self._count('reused')
+                return self._done[key]
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._count('calls')
+            else:
+                self._count('shared')
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function(*args)
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if call.error is None and self.keep:
+                    self._done[key] = call.result
+                    while len(self._done) > self.keep:
+                        self._done.popitem(last=False)
+            call.done.set()
+        return call.result
+
+    def _count(self, event):
+        """This method counts an event, also in the instrumentation counters."""
+        self.counts[event] += 1
+        instrumentation.count('single_flight_' + event)
+
+    def saved(self):
+        """This method returns the number of loads saved by sharing results."""
+        with self._lock:
+            return self.counts['shared'] + self.counts['reused']
+
+    def stats(self):
+        """This method returns a dictionary of the counters."""
+        with self._lock:
+            return {'calls': self.counts['calls'], 'shared': self.counts['shared'],
+                    'reused': self.counts['reused'], 'kept': len(self._done)}
@@ -0,0 +1,99 @@
+"""This module contains the TitleIndex class."""
+
+from .matching import normalize_title, rank
+from .page_cache import normalize_url
+import threading
+import sqlite3
+
+
+def ngrams(text, n=3):
+    """This function returns the set of character n-grams of a padded string."""
+    text = ' ' + text + ' '
+    return {text[i:i + n] for i in range(max(len(text) - n + 1, 1))}
+
+
+class TitleIndex:
+    """
+    This is a class that keeps a local catalog of every (name, year, url) seen
+        on search and movie pages, so that load_movie can resolve a title
+        without loading the search page.  Titles are looked up by their
+        character trigrams, then scored against the normalised search name.
+    """
+
+    def __init__(self, path='./titles.sqlite', min_score=90, year_window=1):
+        """
+        path: string of path to the SQLite database file
+        min_score: text score a match needs to be trusted
+        year_window: maximum difference between the searched and indexed year
+        """
+        self.min_score = min_score
+        self.year_window = year_window
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript('''
+            CREATE TABLE IF NOT EXISTS titles (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                norm TEXT NOT NULL,
+                year INTEGER,
+                url TEXT NOT NULL UNIQUE);
+            CREATE TABLE IF NOT EXISTS grams (
+                gram TEXT NOT NULL,
+                title_id INTEGER NOT NULL REFERENCES titles(id));
+            CREATE INDEX IF NOT EXISTS grams_gram ON grams(gram);
+            CREATE INDEX IF NOT EXISTS titles_year ON titles(year);
+        ''')
+
+    def add(self, name, year, url):
+        """This method adds a title to the index, if its url isn't already in it."""
+        self.add_many([(name, year, url)])
+
+    def add_many(self, titles):
+        """This method adds a list of (name, year, url) tuples in one transaction."""
+        with self._lock, self._db:
+            for name, year, url in titles:
+                norm = normalize_title(name)
+                cursor = self._db.execute(
+                    'INSERT OR IGNORE INTO titles (name, norm, year, url) '
+                    'VALUES (?, ?, ?, ?)', (name, norm, year, normalize_url(url)))
+                if cursor.rowcount:
+                    self._db.executemany(
+                        'INSERT INTO grams (gram, title_id) VALUES (?, ?)',
+                        [(gram, cursor.lastrowid) for gram in ngrams(norm)])
+
+    def candidates(self, name, year=None, limit=20):
+        """
+        This method ranks the (up to limit) indexed titles sharing the most
+            trigrams with name, and returns them as a list of Matches.
+        """
+        norm = normalize_title(name)
+        grams = list(ngrams(norm))
+        query = ('SELECT t.name, t.year, t.url FROM titles t JOIN ('
+                 '  SELECT title_id, COUNT(*) AS shared FROM grams'
+                 '  WHERE gram IN (' + ','.join('?' * len(grams)) + ')'
+                 '  GROUP BY title_id) g ON g.title_id = t.id')
+        params = grams
+        if year:
+            query += ' WHERE t.year BETWEEN ? AND ?'
+            params = params + [year - self.year_window, year + self.year_window]
+        query += ' ORDER BY g.shared DESC LIMIT ?'
+        with self._lock:
+            rows = self._db.execute(query, params + [limit]).fetchall()
+        return rank(name, rows, year)
+
+    def lookup(self, name, year=None):
+        """
+        This method returns the Match of a confident candidate, or None.
+            Without a year, a name matching titles from different years is
+            ambiguous, so None is returned and a live search has to decide.
+        """
+        matches = [match for match in self.candidates(name, year)
+                   if match.text_score >= self.min_score]
+        if not matches:
+            return None
+        if not year and len({match.candidate[1] for match in matches}) > 1:
+            return None
+        return matches[0]
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,6 @@
+"""This module contains the Title of a library folder, shared by the batch modules."""
+
+from collections import namedtuple
+
+# a movie or TV show folder of the library, and the path of its .nfo file
+Title = namedtuple('Title', ['kind', 'name', 'nfo_path'])
@@ -0,0 +1,367 @@
+"""
+This module contains two primary functions that can modify .nfo files
+    using the DVD Netflix Scraper
+
+These functions are intended to be called from the REPL, while in the
+    folder DVDNetflixScraper.
+
+The functions will display the scraped data to the console, ask the user
+    to verify the data, then update the .nfo file accordingly.
+
+"""
+
+from .scraper import NetflixSession
+from .nfo_editor import NfoEditor
+from . import instrumentation
+import os
+
+
+def update_tvshow_nfo(tv_show_name=None,
+                      direct_url=None,
+                      tv_show_folder='/Volumes/Drobo Media/LibraryTools/Metadata/TV/',
+                      data_selections={'landscape': False,
+                                       'plot': False,
+                                       'outline': False,
+                                       'genre-moods': True,
+                                       'best-guess-rating': False,
+                                       'avg-rating': True,
+                                       'netflix-tag': True},
+                      session=None):
+    """
+    This function updates .nfo files for TV shows.
+
+    tv_show_name: exact string of TV show name (case-insensitive)
+    tv_show_folder: exact string to path of TV shows
+    data_selections: dictionary of data in .nfo file to be updated
+    session: the NetflixSession used to scrape, a new one by default
+    """
+
+    if tv_show_name == None:
+        tv_show_name = input('TV show name: ')
+
+    # get folder of TV show and .nfo file
+    path_to_tv_show_nfo = tvshow_nfo_path(tv_show_folder, tv_show_name)
+
+    # open .nfo file and extract info
+    nfo = read_nfo(path_to_tv_show_nfo)
+
+    # start session with scraper and search for TV show
+    session = session or NetflixSession()
+    if not netflix_url(nfo) and not direct_url:
+        print('TV show year: ' + str(tvshow_year(nfo)))
+    load_tvshow(session, nfo, tv_show_name, direct_url)
+
+    # scrape all of the data into variables
+    synopsis = session.get_synopsis()
+    genres = session.get_genres()
+    moods = session.get_moods()
+    guess_rating = session.get_guess_rating()
+    avg_rating = session.get_avg_rating()
+    num_votes = session.get_num_votes()
+
+    nfo_votes = int(nfo.get_text('votes'))
+
+    # print the values for selected data
+    print(' ')
+    print(session.movie_name)
+    print(session.movie_year)
+    if data_selections['plot'] or data_selections['outline']:
+        print(' ')
+        print(synopsis)
+    if data_selections['genre-moods']:
+        print(' ')
+        print(genres)
+        print(moods)
+    if data_selections['best-guess-rating']:
+        print(' ')
+        print(nfo.get_text('rating') + ' -> ' + str(2 * guess_rating))
+    if data_selections['avg-rating']:
+        print(' ')
+        print(nfo.get_text('rating') + ' .. ' + str(2*avg_rating))
+        print(str(nfo_votes) + ' .. ' + str(num_votes))
+
+    # ask for confirmations here
+    #       (y)es to selection
+    #       (c)ustom selection
+    #       (n)o to all
+    print(' ')
+    answer = input('Save?(y/n/c) ')
+
+    # update .nfo and save if 'y'
+    if answer == 'y':
+        apply_selections(nfo, session.extract(), data_selections, 'tvshow')
+    elif answer == 'c':
+        if input('Synopsis?       ') == 'y':
+            update_plot(nfo, synopsis)
+            update_outline(nfo, synopsis)
+        if input('Genre/moods?    ') == 'y':
+            update_genre_moods(nfo, genres, moods)
+        if input('Rating?         ') == 'y':
+            update_rating(nfo, guess_rating, num_votes)
+
+    # save the xml file
+    if answer != 'n':
+        write_nfo(path_to_tv_show_nfo, nfo)
+        print(path_to_tv_show_nfo + ' updated.')
+
+
+def update_movie_nfo(movie_name_and_year=None,
+                     direct_url=None,
+                     movies_folder='/Volumes/Drobo Media/LibraryTools/Metadata/Movies/',
+                     data_selections={'plot': False,
+                                      'outline': False,
+                                      'genre-moods': True,
+                                      'best-guess-rating': False,
+                                      'avg-rating': True,
+                                      'netflix-tag': True},
+                     session=None):
+    """
+    This function updates .nfo files for movies.
+
+    movie_name_and_year: exact string of "movie name (year)" (case-insensitive)
+    movies_folder: exact string to path of movies
+    data_selections: dictionary of data in .nfo file to be updated
+    session: the NetflixSession used to scrape, a new one by default
+    """
+
+    if movie_name_and_year == None:
+        movie_name_and_year = input('Movie: ')
+
+    # recover name and year from input
+    if False and len(movie_name_and_year)>6 and movie_name_and_year[-6]=='(' and movie_name_and_year[-1]==')':
+        movie_name = movie_name_and_year[:-7]
+        movie_year = int(movie_name_and_year[-5:-1])
+    else:
+        movie_name = movie_name_and_year
+        movie_year = None
+
+    # get folder of movie and .nfo file
+    path_to_movie_nfo = movie_nfo_path(movies_folder, movie_name_and_year,
+                                       movie_name)
+
+    # open .nfo file and extract info
+    nfo = read_nfo(path_to_movie_nfo)
+
+    # start session with scraper and search for movie
+    session = session or NetflixSession()
+    load_movie(session, nfo, direct_url)
+
+    # scrape all of the data into variables
+    synopsis = session.get_synopsis()
+    genres = session.get_genres()
+    moods = session.get_moods()
+    guess_rating = session.get_guess_rating()
+    avg_rating = session.get_avg_rating()
+    num_votes = session.get_num_votes()
+
+    nfo_votes = int(nfo.get_text('votes'))
+
+    # print the values for selected data
+    print(' ')
+    print(session.movie_name)
+    print(session.movie_year)
+    if data_selections['plot'] or data_selections['outline']:
+        print(' ')
+        print(synopsis)
+    if data_selections['genre-moods']:
+        print(' ')
+        print(genres)
+        print(moods)
+    if data_selections['best-guess-rating']:
+        print(' ')
+        print(nfo.get_text('rating') + ' -> ' + str(2*guess_rating))
+    if data_selections['avg-rating']:
+        print(' ')
+        print(nfo.get_text('rating') + ' .. ' + str(2*avg_rating))
+        print(str(nfo_votes) + ' .. ' + str(num_votes))
+
+    # ask for confirmations here
+    #       (y)es to selection
+    #       (n)o to all
+    print(' ')
+    answer = input('Save?(y/n/c) ')
+
+    if answer == 'y':
+        apply_selections(nfo, session.extract(), data_selections, 'movie')
+    elif answer == 'c':
+        if input('Synopsis?       ') == 'y':
+            update_plot(nfo, synopsis)
+            update_outline(nfo, synopsis)
+        if input('Genre/moods?    ') == 'y':
+            update_genre_moods(nfo, genres, moods)
+        if input('Rating?         ') == 'y':
+            update_rating(nfo, guess_rating)
+
+    # save the xml file
+    if answer != 'n':
+        write_nfo(path_to_movie_nfo, nfo)
+        print(path_to_movie_nfo + ' updated.')
+
+
+def tvshow_nfo_path(tv_show_folder, tv_show_name):
+    """This function returns the path to the .nfo file of a TV show."""
+    return tv_show_folder + tv_show_name + '/tvshow.nfo'
+
+
+def movie_nfo_path(movies_folder, movie_name_and_year, movie_name=None):
+    """This function returns the path to the .nfo file of a movie."""
+    if movie_name is None:
+        movie_name = movie_name_and_year
+    return movies_folder + movie_name_and_year + '/' + movie_name + '.nfo'
+
+
+def read_nfo(path):
+    """This function opens a .nfo file in an NfoEditor."""
+    with instrumentation.span('nfo_read'):
+        return NfoEditor(path)
+
+
+def write_nfo(path, nfo):
+    """This function atomically saves the edits of a .nfo file."""
+    with instrumentation.span('nfo_write'):
+        nfo.save(path)
+
+
+def tvshow_year(nfo):
+    """This function returns the year a TV show premiered from its .nfo file."""
+    return int(nfo.get_text('premiered')[0:4])
+
+
+def netflix_url(nfo):
+    """This function returns the dvd-netflix-url tag of a .nfo file, or None."""
+    return nfo.get_text('dvd-netflix-url')
+
+
+def search_terms(nfo, kind, tv_show_name=None):
+    """
+    This function returns the (name, year) to search for the title of a .nfo
+        file.  TV shows are searched by folder name and premiere year.
+    """
+    if kind == 'tvshow':
+        return tv_show_name, tvshow_year(nfo)
+    # recover name and year from the .nfo file
+    movie_year = int(nfo.get_text('year'))
+    movie_name = nfo.get_text('title')
+    return movie_name, movie_year or None
+
+
+def load_tvshow(session, nfo, tv_show_name, direct_url=None, interactive=True):
+    """
+    This function loads the Netflix page for the TV show of a .nfo file,
+        skipping the search page if a url tag or direct_url is available.
+
+    interactive: if False, the user is never asked to select a search result
+    """
+    url = netflix_url(nfo) or direct_url
+    if url:
+        session.load_movie_with_url(url)
+    else:
+        session.load_movie(*search_terms(nfo, 'tvshow', tv_show_name),
+                           interactive=interactive)
+
+
+def load_movie(session, nfo, direct_url=None, interactive=True):
+    """
+    This function loads the Netflix page for the movie of a .nfo file,
+        skipping the search page if a url tag or direct_url is available.
+
+    interactive: if False, the user is never asked to select a search result
+    """
+    # skip search page if url tag is found
+    url = netflix_url(nfo) or direct_url
+    if url:
+        session.load_movie_with_url(url)
+    else:
+        session.load_movie(*search_terms(nfo, 'movie'),
+                           interactive=interactive)
+
+
+def apply_selections(nfo, record, data_selections, kind,
+                     votes_must_increase=False, artwork=None):
+    """
+    This function applies the selected data of a MovieRecord to a .nfo file.
+        The average rating is only written when it has more votes than the
+        .nfo file.
+
+    kind: 'movie' or 'tvshow'
+    votes_must_increase: if True, the best guess rating is only written when
+                            the number of votes increased too
+    artwork: an ArtworkDownloader that saves the image in the background
+    """
+    nfo_votes = int(nfo.get_text('votes'))
+    votes_increased = record.num_votes is not None and record.num_votes > nfo_votes
+    if data_selections.get('plot'):
+        update_plot(nfo, record.synopsis)
+    if data_selections.get('outline'):
+        update_outline(nfo, record.synopsis)
+    if data_selections.get('genre-moods'):
+        update_genre_moods(nfo, list(record.genres),
+                           record.moods and list(record.moods))
+    if data_selections.get('best-guess-rating') and record.guess_rating is not None \
+            and (votes_increased or not votes_must_increase):
+        update_rating(nfo, record.guess_rating, record.num_votes)
+    if data_selections.get('avg-rating') and votes_increased:
+        update_rating(nfo, record.avg_rating, record.num_votes)
+    if data_selections.get('landscape'):
+        update_img(record.image, os.path.dirname(nfo.path), artwork)
+    if data_selections.get('netflix-tag'):
+        if kind == 'tvshow':
+            add_netflix_tag_tvshow(nfo, record.url)
+        else:
+            add_netflix_tag_movie(nfo, record.url)
+
+
+def update_outline(nfo, synopsis):
+    nfo.set_text('outline', synopsis)
+
+
+def update_plot(nfo, synopsis):
+    nfo.set_text('plot', synopsis)
+
+
+def update_genre_moods(nfo, genres, moods):
+    # remove 'TV Shows' from genres since it's redundant
+    genres = [genre for genre in genres if genre != 'TV Shows']
+    # need to replace '/' since Kodi uses those to separate genres
+    genres = [genre.replace('/', ' & ') for genre in genres]
+    # create one long string of genres and moods (if available)
+    if moods:
+        moods = [mood.replace('/', ' & ') for mood in moods]
+        new_string = str(' / ').join(genres) + ' / ' + str(' / ').join(moods)
+    else:
+        new_string = str(' / ').join(genres)
+    # replace genre tag in .nfo file, and remove any other genre tags
+    nfo.set_text('genre', new_string)
+    nfo.remove('genre', keep_first=True)
+
+
+def update_rating(nfo, rating, num_votes):
+    nfo.set_text('rating', str(2.*rating))
+    nfo.set_text('votes', str(num_votes))
+
+
+def add_netflix_tag_tvshow(nfo, show_url):
+    if netflix_url(nfo) is None:
+        nfo.append('dvd-netflix-url', show_url)
+
+
+def add_netflix_tag_movie(nfo, movie_url):
+    if netflix_url(nfo) is None:
+        nfo.append('dvd-netflix-url', movie_url)
+
+
+def update_img(img_url, folder='.', artwork=None):
+    """
+    This function saves the image as landscape.jpg in the title's folder.
+        With an ArtworkDownloader, it's downloaded in the background,
+        otherwise a downloader is started for this image only (batch runs
+        share one, see batch_update.UpdatePolicy.run_artwork).
+    """
+    if not img_url:
+        return
+    if artwork is not None:
+        artwork.submit(img_url, folder)
+        return
+    from .artwork import ArtworkDownloader
+    with ArtworkDownloader() as downloader:
+        downloader.download(img_url, folder)
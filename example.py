@@ -1,7 +1,12 @@
 '''This is an example use of the scraper.  See the README for more'''
 
 # import the class from the module
-from DVDNetflixScraper import NetflixSession
+from dvdnetflix.scraper import NetflixSession
+from dvdnetflix import instrumentation
+
+# log to session.log, and time each phase of the loads
+instrumentation.configure_logging('session.log')
+instrumentation.enable(jsonl_path='spans.jsonl')
 
 # create a new session
 session = NetflixSession()
@@ -36,4 +41,8 @@ session_with_cookies.load_movie('blood drive')
 
 # because this show doesn't have a public page, this will fail without cookies
 session_without_cookies = NetflixSession(cookies_file='pickle.cki')
-session_without_cookies.load_movie('blood drive')
+try:
+    session_without_cookies.load_movie('blood drive')
+finally:
+    # seconds spent in each phase, and the counters
+    print(instrumentation.snapshot())
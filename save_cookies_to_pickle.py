@@ -3,6 +3,9 @@ Use this module to save cookies to pickle file.
 
 This is currently only an example, and you must either manually add your own
     cookies, or copy them using a tool, such as the Chrome extension EditThisCookie.
+
+An EditThisCookie export can also be saved as is to a JSON file, and used with
+    NetflixSession(cookies_file='cookies.json') instead.
 """
 
 
@@ -25,4 +28,5 @@ cookies = [
 
 
 import pickle
-pickle.dump(load_cookies(), open("cookie.pkl", "wb"))
+with open("cookie.pkl", "wb") as f:
+    pickle.dump(cookies, f)
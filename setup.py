@@ -0,0 +1,15 @@
+from setuptools import setup
+
+setup(
+    name='DVDNetflixScraper',
+    version='0.2.0',
+    description='Scraper for DVD Netflix pages, and Kodi .nfo file updater',
+    packages=['dvdnetflix'],
+    # lower bounds only, requirements.txt pins the versions tested together
+    install_requires=['fuzzywuzzy>=0.15.0', 'selenium>=3.4.3,<4',
+                      'beautifulsoup4>=4.6.0', 'requests>=2.31.0'],
+    extras_require={'fast': ['lxml', 'rapidfuzz', 'numpy'], 'art': ['Pillow'],
+                    'parquet': ['pyarrow']},
+    entry_points={'console_scripts': ['dvdnetflix = dvdnetflix.cli:main']},
+    python_requires='>=3.7',
+)
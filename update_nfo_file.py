@@ -1,301 +1,7 @@
 """
-This module contains two primary functions that can modify .nfo files
-    using the DVD Netflix Scraper
-
-These functions are intended to be called from the REPL, while in the
-    folder DVDNetflixScraper.
-
-The functions will display the scraped data to the console, ask the user
-    to verify the data, then update the .nfo file accordingly.
-
+This module keeps the .nfo functions available as update_nfo_file in the
+    project folder.  They are in the dvdnetflix package, see
+    dvdnetflix.update_nfo_file.
 """
 
-import urllib.request
-from bs4 import BeautifulSoup
-from DVDNetflixScraper import NetflixSession
-
-
-def update_tvshow_nfo(tv_show_name=None,
-                      direct_url=None,
-                      tv_show_folder='/Volumes/Drobo Media/LibraryTools/Metadata/TV/',
-                      data_selections={'landscape': False,
-                                       'plot': False,
-                                       'outline': False,
-                                       'genre-moods': True,
-                                       'best-guess-rating': False,
-                                       'avg-rating': True,
-                                       'netflix-tag': True}):
-    """
-    This function updates .nfo files for TV shows.
-
-    tv_show_name: exact string of TV show name (case-insensitive)
-    tv_show_folder: exact string to path of TV shows
-    data_selections: dictionary of data in .nfo file to be updated
-    """
-
-    if tv_show_name == None:
-        tv_show_name = input('TV show name: ')
-
-    # get folder of TV show and .nfo file
-    path_to_tv_show = tv_show_folder + tv_show_name + '/'
-    path_to_tv_show_nfo = path_to_tv_show + 'tvshow.nfo'
-
-    # open .nfo file and extract info using bs4
-    with open(path_to_tv_show_nfo) as fp:
-        soup = BeautifulSoup(fp, 'xml')
-
-    # start session with scraper and search for TV show
-    session = NetflixSession()
-
-    # skip the search page if url tag is available
-    if soup.find('dvd-netflix-url'):
-        show_url = soup.find('dvd-netflix-url').get_text()
-        session.load_movie_with_url(show_url)
-    elif direct_url:
-        session.load_movie_with_url(direct_url)
-    else:
-        tv_show_year = int(soup.find('premiered').get_text()[0:4])
-        print('TV show year: ' + str(tv_show_year))
-        session.load_movie(tv_show_name, tv_show_year)
-
-    # scrape all of the data into variables
-    movie_url = session.get_movie_url()
-    synopsis = session.get_synopsis()
-    genres = session.get_genres()
-    moods = session.get_moods()
-    guess_rating = session.get_guess_rating()
-    avg_rating = session.get_avg_rating()
-    num_votes = session.get_num_votes()
-    img_url = session.get_image_link()
-
-    soup_votes = int(soup.find('votes').get_text())
-
-    # print the values for selected data
-    print(' ')
-    print(session.movie_name)
-    print(session.movie_year)
-    if data_selections['plot'] or data_selections['outline']:
-        print(' ')
-        print(synopsis)
-    if data_selections['genre-moods']:
-        print(' ')
-        print(genres)
-        print(moods)
-    if data_selections['best-guess-rating']:
-        print(' ')
-        print(soup.find('rating').get_text() + ' -> ' + str(2 * guess_rating))
-    if data_selections['avg-rating']:
-        print(' ')
-        print(soup.find('rating').get_text() + ' .. ' + str(2*avg_rating))
-        print(str(soup_votes) + ' .. ' + str(num_votes))
-
-    # ask for confirmations here
-    #       (y)es to selection
-    #       (c)ustom selection
-    #       (n)o to all
-    print(' ')
-    answer = input('Save?(y/n/c) ')
-
-    # update .nfo and save if 'y'
-    if answer == 'y':
-        if data_selections['plot']:
-            update_plot(soup, synopsis)
-        if data_selections['outline']:
-            update_outline(soup, synopsis)
-        if data_selections['genre-moods']:
-            update_genre_moods(soup, genres, moods)
-        if data_selections['best-guess-rating']:
-            update_rating(soup, guess_rating, num_votes)
-        if data_selections['avg-rating'] and num_votes>soup_votes:
-            update_rating(soup, avg_rating, num_votes)
-        if data_selections['landscape']:
-            update_img(img_url)
-        if data_selections['netflix-tag']:
-            add_netflix_tag_tvshow(soup, movie_url)
-    elif answer == 'c':
-        if input('Synopsis?       ') == 'y':
-            update_plot(soup, synopsis)
-            update_outline(soup, synopsis)
-        if input('Genre/moods?    ') == 'y':
-            update_genre_moods(soup, genres, moods)
-        if input('Rating?         ') == 'y':
-            update_rating(soup, guess_rating, num_votes)
-
-    # save the xml file
-    if answer != 'n':
-        with open(path_to_tv_show_nfo, 'w') as f:
-            f.write(str(soup))
-        print(path_to_tv_show_nfo + ' updated.')
-
-
-def update_movie_nfo(movie_name_and_year=None,
-                     direct_url=None,
-                     movies_folder='/Volumes/Drobo Media/LibraryTools/Metadata/Movies/',
-                     data_selections={'plot': False,
-                                      'outline': False,
-                                      'genre-moods': True,
-                                      'best-guess-rating': False,
-                                      'avg-rating': True,
-                                      'netflix-tag': True}):
-    """
-    This function updates .nfo files for movies.
-
-    movie_name_and_year: exact string of "movie name (year)" (case-insensitive)
-    movies_folder: exact string to path of movies
-    data_selections: dictionary of data in .nfo file to be updated
-    """
-
-    if movie_name_and_year == None:
-        movie_name_and_year = input('Movie: ')
-
-    # recover name and year from input
-    if False and len(movie_name_and_year)>6 and movie_name_and_year[-6]=='(' and movie_name_and_year[-1]==')':
-        movie_name = movie_name_and_year[:-7]
-        movie_year = int(movie_name_and_year[-5:-1])
-    else:
-        movie_name = movie_name_and_year
-        movie_year = None
-
-    # get folder of movie and .nfo file
-    path_to_movie = movies_folder + movie_name_and_year + '/'
-    path_to_movie_nfo = path_to_movie + movie_name + '.nfo'
-
-    # open .nfo file and extract info using bs4
-    with open(path_to_movie_nfo) as fp:
-        soup = BeautifulSoup(fp, 'xml')
-
-    # recover year if needed
-    movie_year = int(soup.find_all('year')[0].string)
-    movie_name = str(soup.find_all('title')[0].string)
-
-    # start session with scraper and search for movie
-    session = NetflixSession()
-
-    # skip search page if url tag is found
-    if soup.find('dvd-netflix-url'):
-        movie_url = soup.find('dvd-netflix-url').get_text()
-        session.load_movie_with_url(movie_url)
-    elif direct_url:
-        session.load_movie_with_url(direct_url)
-    elif movie_year:
-        session.load_movie(movie_name, movie_year)
-    else:
-        session.load_movie(movie_name)
-
-    # scrape all of the data into variables
-    movie_url = session.get_movie_url()
-    synopsis = session.get_synopsis()
-    genres = session.get_genres()
-    moods = session.get_moods()
-    guess_rating = session.get_guess_rating()
-    avg_rating = session.get_avg_rating()
-    num_votes = session.get_num_votes()
-
-    soup_votes = int(soup.find('votes').get_text())
-
-    # print the values for selected data
-    print(' ')
-    print(session.movie_name)
-    print(session.movie_year)
-    if data_selections['plot'] or data_selections['outline']:
-        print(' ')
-        print(synopsis)
-    if data_selections['genre-moods']:
-        print(' ')
-        print(genres)
-        print(moods)
-    if data_selections['best-guess-rating']:
-        print(' ')
-        print(soup.find('rating').get_text() + ' -> ' + str(2*guess_rating))
-    if data_selections['avg-rating']:
-        print(' ')
-        print(soup.find('rating').get_text() + ' .. ' + str(2*avg_rating))
-        print(str(soup_votes) + ' .. ' + str(num_votes))
-
-    # ask for confirmations here
-    #       (y)es to selection
-    #       (n)o to all
-    print(' ')
-    answer = input('Save?(y/n/c) ')
-
-    if answer == 'y':
-        if data_selections['plot']:
-            update_plot(soup, synopsis)
-        if data_selections['outline']:
-            update_outline(soup, synopsis)
-        if data_selections['genre-moods']:
-            update_genre_moods(soup, genres, moods)
-        if data_selections['best-guess-rating']:
-            update_rating(soup, guess_rating, num_votes)
-        if data_selections['avg-rating'] and num_votes>soup_votes:
-            update_rating(soup, avg_rating, num_votes)
-        if data_selections['netflix-tag']:
-            add_netflix_tag_movie(soup, movie_url)
-    elif answer == 'c':
-        if input('Synopsis?       ') == 'y':
-            update_plot(soup, synopsis)
-            update_outline(soup, synopsis)
-        if input('Genre/moods?    ') == 'y':
-            update_genre_moods(soup, genres, moods)
-        if input('Rating?         ') == 'y':
-            update_rating(soup, guess_rating)
-
-    # save the xml file
-    if answer != 'n':
-        with open(path_to_movie_nfo, 'w') as f:
-            f.write(str(soup))
-        print(path_to_movie_nfo + ' updated.')
-
-
-def update_outline(soup, synopsis):
-    soup.find('outline').string = synopsis
-
-
-def update_plot(soup, synopsis):
-    soup.find('plot').string = synopsis
-
-
-def update_genre_moods(soup, genres, moods):
-    # remove 'TV Shows' from genres since it's redundant
-    try:
-        genres.remove('TV Shows')
-    except ValueError:
-        pass
-    # need to replace '/' since Kodi uses those to separate genres
-    for genre in genres:
-        genre = genre.replace('/', ' & ')
-    # create one long string of genres and moods (if available)
-    if moods:
-        for mood in moods:
-            mood = mood.replace('/', ' & ')
-        new_string = str(' / ').join(genres) + ' / ' + str(' / ').join(moods)
-    else:
-        new_string = str(' / ').join(genres)
-    # replace genre tag in .nfo file
-    soup.find_all('genre')[0].string = new_string
-    # remove any other genre tags
-    for _ in range(1, len(soup.find_all('genre'))):
-        soup.find_all('genre')[1].decompose()
-
-
-def update_rating(soup, rating, num_votes):
-    soup.find('rating').string = str(2.*rating)
-    soup.find('votes').string = str(num_votes)
-
-
-def add_netflix_tag_tvshow(soup, show_url):
-    if not soup.find('dvd-netflix-url'):
-        netflix_tag = soup.new_tag('dvd-netflix-url')
-        netflix_tag.string = show_url
-        soup.find('tvshow').append(netflix_tag)
-
-
-def add_netflix_tag_movie(soup, movie_url):
-    if not soup.find('dvd-netflix-url'):
-        netflix_tag = soup.new_tag('dvd-netflix-url')
-        netflix_tag.string = movie_url
-        soup.find('movie').append(netflix_tag)
-
-
-def update_img(img_url):
-    urllib.request.urlretrieve(img_url, "./landscape.jpg")
+from dvdnetflix.update_nfo_file import *  # noqa: F401,F403